@@ -13,6 +13,7 @@ import re
 import hmac
 import hashlib
 import time
+from functools import lru_cache
 from typing import List, Dict, Tuple
 from datetime import datetime
 
@@ -59,8 +60,21 @@ except Exception as exc:
     HF_IMPORT_ERROR = exc
 
 
+# Short model names accepted by run_pipeline
+HF_MODELS = {
+    'es': 'mrm8488/bert-spanish-cased-finetuned-ner',
+    'en': 'dslim/bert-base-NER',
+}
+
+
+@lru_cache(maxsize=4)
+def get_hf_ner(hf_model: str):
+    """Load the transformers NER pipeline once per model and reuse it."""
+    return hf_pipeline("ner", model=hf_model, grouped_entities=True)
+
+
 def hf_get_entities(text: str, hf_model: str):
-    ner = hf_pipeline("ner", model=hf_model, grouped_entities=True)
+    ner = get_hf_ner(hf_model)
     return ner(text)
 
 
@@ -693,11 +707,7 @@ def apply_replacements_from_matches(original_text: str, matches: List[Dict], use
 def run_pipeline(model: str, text: str, use_regex: bool = False, pseudonymize: bool = False, save_mapping: bool = True, use_realistic_fake: bool = False):
     start_time = time.time()
     
-    model_map = {
-        'es': 'mrm8488/bert-spanish-cased-finetuned-ner',
-        'en': 'dslim/bert-base-NER',
-    }
-    hf_model = model_map.get(model, model)
+    hf_model = HF_MODELS.get(model, model)
 
     regex_first = False
     if isinstance(text, dict):
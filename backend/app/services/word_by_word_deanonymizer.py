@@ -9,6 +9,8 @@ más fluido y natural.
 import re
 import logging
 import time
+from bisect import bisect_left
+from functools import lru_cache
 from typing import Dict, List, Tuple, Optional
 
 # Import metrics collection
@@ -21,13 +23,252 @@ try:
 except Exception:
     METRICS_AVAILABLE = False
 
+# Autómata Aho-Corasick en C para el reemplazo exacto de tokens (opcional)
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# A partir de este número de tokens el autómata Aho-Corasick compensa frente a la alternancia
+_AC_MIN_TOKENS = 100
+
+# Tabla ASCII de separadores de palabra: 1 si el carácter es separador
+_SEP_TABLE = bytes(
+    1 if (chr(i).isspace() or chr(i) in '.,!?;:()[]{}"\'-/\\|<>=+*&%$#@') else 0
+    for i in range(128)
+)
+
+# Separadores que hacen que un token pueda llegar dividido entre chunks
+_COMPLEX_SEP = frozenset(' -@')
+
+# Último carácter de corte natural dentro de una ventana (search con pos/endpos)
+_CUTOFF_RE = re.compile(r'[ \n\t.,;:!)}\]][^ \n\t.,;:!)}\]]*\Z')
+
+# Delimitadores de frame SSE ya codificados (StreamingResponse acepta bytes)
+_SSE_PREFIX = b'data: '
+_SSE_SUFFIX = b'\n\n'
+
+# ------------------------------------------------------------------
+# Patrones regex precompilados (se usan en cada chunk del streaming)
+# ------------------------------------------------------------------
+
+# Formatos de teléfono para detectar tokens que generan variaciones
+_PHONE_FORMAT_PATTERNS = [re.compile(p) for p in (
+    r'\+\d{1,3}[\s\-]?\d{3}[\s\-]?\d{3}[\s\-]?\d{3}',
+    r'\d{3}[\s\-]?\d{3}[\s\-]?\d{3}',
+    r'\(\+\d{1,3}\)[\s\-]?\d{3}[\s\-]?\d{3}[\s\-]?\d{3}',
+)]
+
+_IBAN_TOKEN_RE = re.compile(r'^[A-Z]{2}\d{2}[\s\d]+$')
+
+_WS_DASH_RE = re.compile(r'[\s\-]')
+
+# Valores que podrían estar incompletos al final del buffer, en una sola alternancia.
+# "user@" y "(+34 612..." no necesitan rama propia: ya los cubren email y phone.
+_INCOMPLETE_END_RE = re.compile(
+    r'(?P<email>[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]*$)'                        # user@domain...
+    r'|(?P<phone>\+\d{1,3}[\s\-]*\d{0,3}[\s\-]*\d{0,3}[\s\-]*\d{0,3}$)'     # +34 612...
+    r'|(?P<card>\d{4}[\s\-]*\d{0,4}[\s\-]*\d{0,4}[\s\-]*\d{0,4}$)'        # 1234 5678...
+    r'|(?P<dni>\d{1,8}[A-Z]?$)'                                             # 12345678...
+)
+
+# Prefiltro barato: todo patrón de IBAN con código de país necesita "XX00" (o "XX 00")
+_IBAN_PREFIX_RE = re.compile(r'[A-Z]{2}\s*\d{2}')
+
+
+def _ends_with_digit(text: str) -> bool:
+    """Prefiltro para patrones anclados en '\d$' ($ también acepta un salto de línea final)"""
+    if text.endswith('\n'):
+        text = text[:-1]
+    return text[-1:].isdigit()
+
+
+# Fragmentos de IBAN sin código de país (solo importa si alguno aparece: una sola alternancia)
+_IBAN_FRAGMENT_RE = re.compile(
+    r'\d{2,4}\s+\d{4}\s+\d{4}(?:\s+\d{1,2})?$'   # "03 4839 3015 63"
+    r'|S\d{2}\s+\d{4}\s+\d{4}(?:\s+\d{1,2})?$'   # "S03 4839 3015 63"
+    r'|\d{4}\s+\d{4}\s+\d{2}\s+\d{1,3}$'         # "4839 3015 63 962"
+)
+
+# Posibles IBANs (con código de país) cerca del final del texto
+_INCOMPLETE_IBAN_PATTERNS = [re.compile(p) for p in (
+    r'ES\s*\d{2}[\s\d]*',                     # ES33 8565...
+    r'[A-Z]{2}\s*\d{2}[\s\d]*',             # Cualquier país
+    r'[A-Z]{2}\d{2}[\s\d]*',                 # Sin espacios iniciales
+)]
+
+# Finales claros y ambiguos tras un IBAN
+_CLEAR_ENDING_PATTERNS = [re.compile(p) for p in (
+    r'^\s*\n',                  # Nueva línea después
+    r'^\s*[.,:;!?]',           # Puntuación
+    r'^\s*$',                   # Final de texto
+    r'^\s+[a-zA-Z]{2,}',       # Espacio + palabra (no número)
+    r'^\s*[-\)\]\}]',          # Caracteres de cierre
+)]
+_AMBIGUOUS_ENDING_PATTERNS = [re.compile(p) for p in (
+    r'^\s*\d',                  # Más dígitos después
+    r'^[A-Z0-9]',              # Más caracteres alfanuméricos
+)]
+
+# IBAN anónimo fragmentado, como una sola alternancia. Todas las ramas empiezan por
+# "XX00" y siguen solo con dígitos y espacios hasta el final, así que en un texto dado
+# coinciden (si lo hacen) desde la misma posición: basta con una búsqueda
+_ANONYMOUS_IBAN_RE = re.compile('|'.join(f'(?:{p})' for p in (
+    # Patrones específicos existentes
+    r'ES\d{2}\s+\d{4}\s+\d{4}\s+\d{2}\s+\d{1,3}$',        # ES66 2127 7396 56 5
+    r'ES\d{2}\s+\d{4}\s+\d{4}\s+\d{2}\s+\d{1,4}$',        # ES03 0338 4034 42 5xxx
+    r'[A-Z]{2}\d{2}\s+\d{4}\s+\d{4}\s+\d{2}\s+\d{1,4}$',  # Genérico ampliado
+    
+    # Patrones más cortos para detección temprana
+    r'ES\d{2}\s+\d{4}\s+\d{4}$',                          # ES66 2127 7396 (más corto)
+    r'ES\d{2}\s+\d{4}\s+\d{3,4}\s+\d{1,3}$',              # ES03 0338 403x xx x
+    r'[A-Z]{2}\d{2}\s+\d{4}\s+\d{3,4}\s+\d{1,3}$',        # Genérico medio
+    
+    # Patrones muy específicos para casos edge
+    r'[A-Z]{2}\d{2}\s+\d{4}\s+\d{3}\s+\d{2}\s+\d{1}$',    # ES12 3456 789 12 3
+    r'[A-Z]{2}\d{2}\s+\d{4}\s+\d{4}\s+\d{1,2}\s+\d{1,4}$', # Variaciones amplias
+    
+    # Patrones sin espacios (para IBANs concatenados)
+    r'ES\d{2}\d{4}\d{4}\d{2}\d{1,4}$',                    # ES030338403442 + fragmento
+    r'[A-Z]{2}\d{2}\d{4}\d{4}\d{2}\d{1,4}$',              # Genérico sin espacios
+    
+    # Detección ultra-agresiva de cualquier secuencia que empiece como IBAN
+    r'ES\d{2}[\s\d]{10,20}$',                             # ES + 2 dígitos + 10-20 chars
+    r'[A-Z]{2}\d{2}[\s\d]{10,20}$',                       # Cualquier país + patrón similar
+)))
+
+# Tokens de continuación que podrían completar un IBAN anónimo fragmentado, en una sola
+# alternancia. Las variantes numéricas (8-15, 6-10, 3x4 dígitos...) quedan todas cubiertas
+# por "5 o más dígitos", y "(328)-565-308" contiene "328-565-308".
+_CONTINUATION_RE = re.compile(
+    r'\d{3}-\d{3}-\d{3}$'             # 328-565-308, (328)-565-308
+    r'|\(\d{3}\)\s?\d{3}-?\d{3}$'      # (328) 565-308 o (328)565308
+    r'|\d{5,}$'                       # 5 o más dígitos consecutivos (posibles tokens IBAN)
+)
+
+# IBAN español completo en grupos de 4 (se envía sin esperar más datos)
+_IBAN_COMPLETE_RE = re.compile(r'ES\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}')
+
+# Formatos de teléfono que el LLM puede generar, para _smart_phone_replacement, en una sola
+# alternancia (los formatos más específicos primero). El patrón r'\d{9}' se retiró:
+# confunde partes de IBANs con teléfonos
+_SMART_PHONE_RE = re.compile('|'.join(f'(?:{p})' for p in (
+    r'\(\+\d{1,3}\)\s*\d{3}-\d{3}-\d{3}',  # (+34) 793-914-603
+    r'\(\+\d{1,3}-\d{3}-\d{3}-\d{3}\)',    # (+34-677-977-056)
+    r'\+\d{1,3}-\d{3}-\d{3}-\d{3}',        # +34-652-433-881
+    r'\+\d{1,3}\s+\d{3}\s+\d{3}\s+\d{3}',  # +34 612 345 678
+    r'\d{3}\s+\d{3}\s+\d{3}',              # 793 914 603
+    r'\d{3}-\d{3}-\d{3}',                  # 793-914-603
+    r'\+\d{1,3}\s?\d{6,}',                 # Internacional genérico
+)))
+
+# Indicadores de contexto IBAN alrededor de una secuencia de dígitos, en una sola alternancia
+# (sin distinguir mayúsculas, el patrón genérico ya cubre "ES00...")
+_IBAN_CONTEXT_RE = re.compile(
+    r'cuenta\s+bancaria'
+    r'|número\s+de\s+cuenta'
+    r'|IBAN'
+    r'|[A-Z]{2}\d{2}[\s\d]+',     # Patrón IBAN (español o genérico)
+    re.IGNORECASE
+)
+
+# Código de país de IBAN justo antes de una secuencia de dígitos
+_IBAN_BEFORE_CONTEXT_RE = re.compile(r'ES\s*\d{0,2}[\s\d]*$')
+
+# Token anonimizado de teléfono ("[PHONE_1]", "[tel_2]"...)
+_PHONE_TOKEN_RE = re.compile(r'\[(?:PHONE|TEL)_', re.IGNORECASE)
+
+# Valor con forma de teléfono
+_PHONE_VALUE_RE = re.compile(r'(\+?\d[\d\s\-()]{6,}\d)')
+
+# Separadores entre las partes de un token de teléfono
+_SEP_RUN_RE = re.compile(r'[\s\-]+')
+
+# Tabla de traducción que elimina todo carácter ASCII que no sea dígito
+_NON_DIGITS = str.maketrans('', '', ''.join(chr(i) for i in range(128) if not chr(i).isdigit()))
+
+
+def _extract_digits(text: str) -> str:
+    """Extrae solo los dígitos de un texto (traducción en C; el resto no ASCII se filtra aparte)"""
+    digits = text.translate(_NON_DIGITS)
+    if digits.isascii():
+        return digits
+    return ''.join(filter(str.isdigit, digits))
+
+
+# Caracteres que se descartan (y tramos que se conservan) al normalizar para matching flexible
+_NORM_RE = re.compile(r'[^\w@.]')
+_NORM_KEEP_RE = re.compile(r'[\w@.]+')
+
+
+@lru_cache(maxsize=4096)
+def _normalize_cached(text: str) -> str:
+    """Normalización memoizada para tokens del mapping (cadenas cortas y repetidas)"""
+    return _NORM_RE.sub('', text).lower()
+
+
+# Letras de IBAN a su valor numérico (A=10 ... Z=35; las minúsculas como ord(c) - 55)
+_IBAN_LETTER_VALUES = str.maketrans({
+    c: str(ord(c) - 55) for c in 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+})
+
+
+@lru_cache(maxsize=512)
+def _iban_checksum_ok(clean_iban: str) -> bool:
+    """
+    Dígitos de control de un IBAN (mod 97 == 1)
+    
+    Memoizada: el LLM repite los mismos IBANs a lo largo del streaming.
+    """
+    rearr = clean_iban[4:] + clean_iban[:4]
+    
+    # Expandir letras en C; un entero de ~26 dígitos se reduce mod 97 más rápido
+    # que cualquier bucle carácter a carácter en Python
+    converted = rearr.translate(_IBAN_LETTER_VALUES)
+    if not (converted.isascii() and converted.isdigit()):
+        # Caracteres poco habituales: conservar la semántica de int()
+        converted = ''.join(str(ord(c) - 55) if c.isalpha() else c for c in rearr)
+    try:
+        return int(converted) % 97 == 1
+    except ValueError:
+        return False
+
+
+def _join_replacements(text: str, replacements: List[Tuple[int, int, str]]) -> str:
+    """Reconstruye el texto en una sola pasada a partir de reemplazos (inicio, fin, valor) sin solapes"""
+    if not replacements:
+        return text
+    
+    parts = []
+    cursor = 0
+    for start, end, replacement in sorted(replacements):
+        parts.append(text[cursor:start])
+        parts.append(replacement)
+        cursor = end
+    parts.append(text[cursor:])
+    
+    return ''.join(parts)
+
+
 class WordByWordDeanonymizer:
     """
     Deanonimizador que procesa streaming palabra por palabra para mayor fluidez
     """
     
+    # Se crea una instancia por sesión de streaming: sin __dict__ por instancia
+    __slots__ = (
+        'original_mapping', 'mapping', 'inverted_mapping',
+        'partial_word', '_buf', '_buf_len', 'max_buffer_size',
+        'words_processed', 'names_replaced',
+        'word_mapping', 'multiword_mapping', 'complex_patterns',
+        '_sorted_tokens', '_token_initials', '_ac', '_exact_re', '_exact_dirty',
+        '_phone_by_digits', '_phone_by_tail9', '_phone_by_tail7', '_has_phone_tokens', '_has_complex',
+        '_complex_by_normalized',
+    )
+    
     def __init__(self, mapping: Dict[str, str]):
         """
         Inicializa el deanonimizador
@@ -45,8 +286,10 @@ class WordByWordDeanonymizer:
         self.partial_word = ""
         
         # Buffer inteligente para valores complejos que pueden dividirse entre chunks
-        self.smart_buffer = ""
-        self.max_buffer_size = 200  # Tamaño máximo del buffer inteligente
+        # (lista de fragmentos con su longitud acumulada: añadir no copia el buffer completo)
+        self._buf = []
+        self._buf_len = 0
+        self.max_buffer_size = 200  # Tamaño máximo del buffer inteligente (caracteres)
         
         # Métricas de procesamiento
         self.words_processed = 0
@@ -55,9 +298,15 @@ class WordByWordDeanonymizer:
         # Preparar mapeo optimizado
         self._prepare_word_mapping()
         self._prepare_complex_patterns()
+        self._ensure_exact_matcher()
         
         logger.info(f"WordByWordDeanonymizer initialized with {len(self.original_mapping)} original mappings, expanded to {len(self.mapping)} variations")
     
+    @property
+    def smart_buffer(self) -> str:
+        """Contenido actual del buffer inteligente como texto"""
+        return ''.join(self._buf)
+    
     def add_mapping(self, new_mapping: Dict[str, str]):
         """
         Añade nuevos mappings al deanonimizador existente
@@ -79,9 +328,10 @@ class WordByWordDeanonymizer:
         for fake, real in expanded_new.items():
             self.inverted_mapping[real] = fake
         
-        # Reconfigurar patrones
-        self._prepare_word_mapping()
-        self._prepare_complex_patterns()
+        # Reconfigurar patrones solo con las entradas nuevas (el matcher exacto se
+        # reconstruye una vez, en el siguiente procesamiento, ver _ensure_exact_matcher)
+        self._prepare_word_mapping(expanded_new)
+        self._prepare_complex_patterns(expanded_new)
         
         logger.info(f"Added {len(new_mapping)} new mappings, expanded to {len(expanded_new)} variations. Total mappings: {len(self.mapping)}")
     
@@ -95,8 +345,6 @@ class WordByWordDeanonymizer:
         """
         expanded = original_mapping.copy()
         
-        import re
-        
         for fake_token, real_value in original_mapping.items():
             variations = []
             
@@ -116,35 +364,28 @@ class WordByWordDeanonymizer:
             for variation in variations:
                 if variation not in expanded:  # No sobrescribir mappings existentes
                     expanded[variation] = real_value
-                    logger.debug(f"Added variation: '{variation}' -> '{real_value}' (from '{fake_token}')")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"Added variation: '{variation}' -> '{real_value}' (from '{fake_token}')")
         
         return expanded
     
     def _looks_like_phone(self, text: str) -> bool:
         """Detecta si un texto parece un teléfono"""
-        import re
-        phone_patterns = [
-            r'\+\d{1,3}[\s\-]?\d{3}[\s\-]?\d{3}[\s\-]?\d{3}',
-            r'\d{3}[\s\-]?\d{3}[\s\-]?\d{3}',
-            r'\(\+\d{1,3}\)[\s\-]?\d{3}[\s\-]?\d{3}[\s\-]?\d{3}',
-        ]
-        return any(re.search(pattern, text) for pattern in phone_patterns)
+        return any(pattern.search(text) for pattern in _PHONE_FORMAT_PATTERNS)
     
     def _looks_like_iban(self, text: str) -> bool:
         """Detecta si un texto parece un IBAN"""
-        import re
-        return bool(re.match(r'^[A-Z]{2}\d{2}[\s\d]+$', text))
+        return bool(_IBAN_TOKEN_RE.match(text))
     
     def _generate_phone_variations(self, original_phone: str, real_value: str) -> list:
         """
         Genera variaciones comunes de formato de teléfono
         que el LLM podría usar
         """
-        import re
         variations = []
         
         # Extraer solo dígitos
-        digits = ''.join(filter(str.isdigit, original_phone))
+        digits = _extract_digits(original_phone)
         
         if len(digits) >= 9:  # Teléfono válido
             # Formatos comunes que puede generar el LLM:
@@ -197,41 +438,133 @@ class WordByWordDeanonymizer:
         # Los emails suelen mantener formato, pero por completeness
         return [original_email.lower(), original_email.upper()]
     
-    def _prepare_word_mapping(self):
-        """Prepara el mapeo optimizado para búsquedas rápidas"""
-        self.word_mapping = {}
-        self.multiword_mapping = {}
-        self.name_prefixes = set()
+    def _prepare_word_mapping(self, only_new: Optional[Dict[str, str]] = None):
+        """
+        Prepara el mapeo optimizado para búsquedas rápidas
         
-        for fake_token, real_value in self.mapping.items():
+        Args:
+            only_new: Si se indica, solo se indexan estas entradas (ya incluidas en self.mapping)
+        """
+        if only_new is None:
+            self.word_mapping = {}
+            self.multiword_mapping = {}
+            
+            # Índices de teléfonos por dígitos completos y por últimos dígitos:
+            # {dígitos: (token_fake, valor_real)}
+            self._phone_by_digits = {}
+            self._phone_by_tail9 = {}
+            self._phone_by_tail7 = {}
+            entries = self.mapping
+        else:
+            entries = only_new
+        
+        # El matcher exacto depende del mapping completo: se reconstruye de forma diferida
+        self._exact_dirty = True
+        
+        for fake_token, real_value in entries.items():
             # Usar el token completo con corchetes para mapeo directo
             self.word_mapping[fake_token] = real_value
             
-            # También añadir prefijos progresivos para detección temprana
-            for i in range(2, len(fake_token) + 1):
-                prefix = fake_token[:i]
-                self.name_prefixes.add(prefix)
+            # Indexar dígitos del token para búsqueda O(1) en _smart_phone_replacement
+            # (conserva la prioridad del primer token en orden del mapping; un token
+            # que ya estaba indexado solo actualiza su valor real)
+            fake_digits = _extract_digits(fake_token)
+            if len(fake_digits) >= 7:
+                self._index_phone_tail(self._phone_by_digits, fake_digits, fake_token, real_value)
+            if len(fake_digits) >= 9:
+                self._index_phone_tail(self._phone_by_tail9, fake_digits[-9:], fake_token, real_value)
+            if len(fake_digits) >= 7:
+                self._index_phone_tail(self._phone_by_tail7, fake_digits[-7:], fake_token, real_value)
             
             # Para nombres multi-palabra, registrar también
             real_words = real_value.split()
             if len(real_words) > 1:
                 self.multiword_mapping[fake_token] = real_value
+            else:
+                self.multiword_mapping.pop(fake_token, None)
+    
+    @staticmethod
+    def _index_phone_tail(index: Dict[str, Tuple[str, str]], tail: str, fake_token: str, real_value: str):
+        """Registra (token_fake, valor_real) bajo sus últimos dígitos si el hueco está libre o es suyo"""
+        current = index.get(tail)
+        if current is None or current[0] == fake_token:
+            index[tail] = (fake_token, real_value)
     
-    def _prepare_complex_patterns(self):
-        """Prepara patrones para valores complejos que pueden dividirse entre chunks"""
-        self.complex_patterns = []
+    def _ensure_exact_matcher(self):
+        """Reconstruye el matcher exacto si el mapping cambió desde la última construcción"""
+        if not self._exact_dirty:
+            return
+        
+        # Tokens ordenados para detectar prefijos con búsqueda binaria
+        self._sorted_tokens = tuple(sorted(self.mapping))
+        
+        # Caracteres con los que empieza algún token (pocos: '[', '+', '(', 'E'...)
+        self._token_initials = frozenset(fake[0] for fake in self.mapping if fake)
+        
+        # Pares (token, valor) ordenados del token más largo al más corto, para que
+        # los tokens largos se reemplacen antes que los tokens contenidos en ellos
+        items_sorted = tuple(sorted(
+            ((fake, real) for fake, real in self.mapping.items() if fake),
+            key=lambda item: -len(item[0])
+        ))
+        
+        # Reemplazo exacto de todos los tokens en una sola pasada: autómata Aho-Corasick para
+        # mappings grandes (si pyahocorasick está instalado), si no una alternancia compilada
+        # (el más largo primero, así que gana la coincidencia más larga en cada posición)
+        self._ac = None
+        self._exact_re = None
+        if items_sorted:
+            if AHOCORASICK_AVAILABLE and len(items_sorted) > _AC_MIN_TOKENS:
+                self._ac = ahocorasick.Automaton()
+                for fake_token, real_value in items_sorted:
+                    self._ac.add_word(fake_token, (len(fake_token), real_value))
+                self._ac.make_automaton()
+            else:
+                self._exact_re = re.compile('|'.join(re.escape(fake) for fake, _ in items_sorted))
+        
+        self._exact_dirty = False
+    
+    def _prepare_complex_patterns(self, only_new: Optional[Dict[str, str]] = None):
+        """
+        Prepara patrones para valores complejos que pueden dividirse entre chunks
         
-        for fake_token, real_value in self.mapping.items():
-            # Identificar patrones complejos (con espacios, guiones, etc.)
-            if any(char in fake_token for char in [' ', '-', '@', 'ES']):
+        Args:
+            only_new: Si se indica, solo se añaden patrones para estas entradas
+        """
+        if only_new is None:
+            self.complex_patterns = []
+            self._complex_by_normalized = {}
+            entries = self.mapping
+        else:
+            entries = only_new
+        
+        for fake_token, real_value in entries.items():
+            # Identificar patrones complejos: con espacios, guiones o '@', o que contienen 'ES' (IBAN)
+            if 'ES' in fake_token or not _COMPLEX_SEP.isdisjoint(fake_token):
+                # Las variaciones de formato de un mismo dato comparten forma normalizada:
+                # basta con un patrón por forma (el primero, es decir, el token original)
+                normalized = _normalize_cached(fake_token)
+                existing = self._complex_by_normalized.get(normalized)
+                if existing is not None:
+                    if existing['original'] == fake_token:
+                        existing['replacement'] = real_value
+                    continue
+                
                 # Crear patrón flexible que permita divisiones
                 pattern_parts = self._create_flexible_pattern(fake_token)
-                self.complex_patterns.append({
+                pattern_info = {
                     'original': fake_token,
                     'replacement': real_value,
                     'pattern_parts': pattern_parts,
-                    'normalized': self._normalize_for_matching(fake_token)
-                })
+                    'normalized': normalized
+                }
+                self.complex_patterns.append(pattern_info)
+                self._complex_by_normalized[normalized] = pattern_info
+        
+        # Atajos: sin tokens con dígitos de teléfono o sin patrones complejos no hay nada que buscar
+        # (_phone_by_tail7 contiene todo token con 7 o más dígitos, ver _prepare_word_mapping)
+        self._has_phone_tokens = bool(self._phone_by_tail7)
+        self._has_complex = bool(self.complex_patterns)
     
     def _create_flexible_pattern(self, token: str) -> List[str]:
         """Crea partes flexibles de un patrón que pueden aparecer divididas"""
@@ -255,15 +588,30 @@ class WordByWordDeanonymizer:
         
         else:
             # Teléfonos y otros: dividir por espacios y guiones
-            import re
-            parts = re.split(r'[\s\-]+', token)
+            parts = _SEP_RUN_RE.split(token)
             return [p for p in parts if p]
     
-    def _normalize_for_matching(self, text: str) -> str:
-        """Normaliza texto para matching flexible"""
-        import re
-        # Quitar espacios, guiones, paréntesis y mantener solo alfanuméricos
-        return re.sub(r'[^\w@.]', '', text).lower()
+    def _normalize_with_map(self, text: str) -> Tuple[str, List[int]]:
+        """
+        Normaliza texto para matching flexible guardando el origen de cada carácter
+        
+        Returns:
+            Tuple[str, List[int]]: (texto_normalizado, posición_original_de_cada_carácter)
+        """
+        parts = []
+        index_map = []
+        for run in _NORM_KEEP_RE.finditer(text):
+            start, end = run.span()
+            lowered = run.group().lower()
+            parts.append(lowered)
+            if len(lowered) == end - start:
+                index_map.extend(range(start, end))
+            else:
+                # lower() cambió la longitud (p. ej. 'İ'): mapear carácter a carácter
+                for offset, char in enumerate(run.group()):
+                    index_map.extend([start + offset] * len(char.lower()))
+        
+        return ''.join(parts), index_map
     
     def process_chunk(self, chunk: str) -> str:
         """
@@ -278,27 +626,32 @@ class WordByWordDeanonymizer:
         if not chunk:
             return ""
         
-        start_time = time.time()
+        # Sin métricas no hace falta medir tiempos (perf_counter: monotónico y más barato)
+        start_time = time.perf_counter() if METRICS_AVAILABLE else 0.0
+        self._ensure_exact_matcher()
         
         try:
             # Añadir al buffer inteligente
-            self.smart_buffer += chunk
+            self._buf.append(chunk)
+            self._buf_len += len(chunk)
             
             # Limitar el tamaño del buffer para evitar problemas de memoria
-            if len(self.smart_buffer) > self.max_buffer_size:
+            if self._buf_len > self.max_buffer_size:
                 # Mantener solo la parte final del buffer
-                self.smart_buffer = self.smart_buffer[-self.max_buffer_size:]
+                kept = ''.join(self._buf)[-self.max_buffer_size:]
+                self._buf = [kept]
+                self._buf_len = len(kept)
             
             # Procesar con el método mejorado
             result, buffer_to_keep = self._process_with_smart_buffer()
             
             # Actualizar el buffer con lo que debemos conservar
-            self.smart_buffer = buffer_to_keep
+            self._buf = [buffer_to_keep] if buffer_to_keep else []
+            self._buf_len = len(buffer_to_keep)
             
             # Record metrics if available
             if METRICS_AVAILABLE and result:
-                duration = time.time() - start_time
-                record_deanonymization_request(duration)
+                record_deanonymization_request(time.perf_counter() - start_time)
             
             return result
             
@@ -309,6 +662,21 @@ class WordByWordDeanonymizer:
             # Fallback al método original
             return self._process_chunk_fallback(chunk)
     
+    def process_chunks(self, chunks: List[str]) -> str:
+        """
+        Procesa varios chunks de streaming con una sola pasada del pipeline
+        
+        La salida es la misma que procesando su concatenación: el buffer inteligente
+        decide dónde cortar, así que no se conservan las fronteras entre chunks.
+        
+        Args:
+            chunks: Fragmentos consecutivos del streaming
+            
+        Returns:
+            Texto procesado con reemplazos aplicados
+        """
+        return self.process_chunk(''.join(chunks))
+    
     def _process_with_smart_buffer(self) -> Tuple[str, str]:
         """
         Procesa el buffer inteligente buscando patrones completos y parciales
@@ -316,14 +684,14 @@ class WordByWordDeanonymizer:
         Returns:
             Tuple[str, str]: (resultado_a_enviar, buffer_a_conservar)
         """
-        buffer_text = self.smart_buffer
+        buffer_text = ''.join(self._buf)
         
-        # 1. Buscar y reemplazar tokens exactos primero
-        for fake_token, real_value in self.mapping.items():
-            if fake_token in buffer_text:
-                buffer_text = buffer_text.replace(fake_token, real_value)
-                self.names_replaced += 1
-                logger.debug(f"Exact replacement: '{fake_token}' -> '{real_value}'")
+        # 1. Buscar y reemplazar tokens exactos primero (una sola pasada)
+        buffer_text, replaced = self._replace_exact_tokens(buffer_text)
+        if replaced:
+            self.names_replaced += replaced
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Exact replacements: {replaced}")
         
         # 2. Buscar patrones complejos con matching flexible
         buffer_text = self._smart_complex_replacement(buffer_text)
@@ -333,56 +701,105 @@ class WordByWordDeanonymizer:
         
         return safe_to_send, keep_in_buffer
     
+    def _replace_exact_tokens(self, text: str) -> Tuple[str, int]:
+        """
+        Reemplaza todos los tokens exactos del mapping en una sola pasada,
+        eligiendo siempre la coincidencia más a la izquierda y más larga
+        
+        Returns:
+            Tuple[str, int]: (texto_reemplazado, número_de_reemplazos)
+        """
+        if self._ac is not None:
+            # Ordenar por inicio y, a igual inicio, del más largo al más corto
+            matches = sorted(
+                (end - length + 1, -length, real_value)
+                for end, (length, real_value) in self._ac.iter(text)
+            )
+            replacements = []
+            cursor = 0
+            for start, neg_length, real_value in matches:
+                if start >= cursor:
+                    cursor = start - neg_length
+                    replacements.append((start, cursor, real_value))
+            return _join_replacements(text, replacements), len(replacements)
+        
+        if self._exact_re is not None:
+            return self._exact_re.subn(self._exact_replacement, text)
+        
+        return text, 0
+    
+    def _exact_replacement(self, match) -> str:
+        """Devuelve el valor real para un token exacto encontrado por _exact_re"""
+        return self.mapping[match.group(0)]
+    
     def _smart_complex_replacement(self, text: str) -> str:
         """Aplica reemplazos inteligentes para patrones complejos"""
         
         # Aplicar smart phone replacement existente
-        text = self._smart_phone_replacement(text)
+        if self._has_phone_tokens:
+            text = self._smart_phone_replacement(text)
         
-        # Aplicar reemplazos para otros patrones complejos
-        for pattern_info in self.complex_patterns:
-            text = self._apply_flexible_pattern_replacement(text, pattern_info)
+        if not self._has_complex:
+            return text
         
-        return text
+        # Candidatos: patrones cuya forma normalizada sigue en el buffer. Tras el reemplazo
+        # exacto suele no quedar ninguno, y entonces no hace falta construir el mapa de índices
+        normalized_text = _NORM_RE.sub('', text).lower()
+        candidates = [p for p in self.complex_patterns if p['normalized'] in normalized_text]
+        if not candidates:
+            return text
+        
+        # Normalizar con mapa de posiciones una sola vez para todos los candidatos
+        normalized_text, index_map = self._normalize_with_map(text)
+        
+        # Reunir los reemplazos de otros patrones complejos y reconstruir el texto una sola vez
+        replacements = []
+        for pattern_info in candidates:
+            self._apply_flexible_pattern_replacement(text, normalized_text, index_map, pattern_info, replacements)
+        
+        return _join_replacements(text, replacements)
     
-    def _apply_flexible_pattern_replacement(self, text: str, pattern_info: Dict) -> str:
-        """Aplica reemplazo flexible para un patrón específico"""
+    def _apply_flexible_pattern_replacement(self, text: str, normalized_text: str, index_map: List[int],
+                                            pattern_info: Dict, replacements: List[Tuple[int, int, str]]):
+        """
+        Registra los reemplazos flexibles para un patrón específico
+        
+        Las coincidencias se buscan en el texto normalizado y se traducen a posiciones
+        del texto original con index_map (ver _normalize_with_map). Los tramos ya
+        reclamados en replacements por patrones anteriores se saltan, igual que si
+        el texto se hubiera modificado patrón a patrón. Se registran todas las
+        apariciones: las variaciones de formato que comparten forma normalizada
+        no tienen patrón propio (ver _prepare_complex_patterns).
+        """
         original = pattern_info['original']
         replacement = pattern_info['replacement']
         normalized_original = pattern_info['normalized']
         
-        # Normalizar el texto para buscar coincidencias flexibles
-        normalized_text = self._normalize_for_matching(text)
-        
-        # Buscar el patrón normalizado en el texto normalizado
-        if normalized_original in normalized_text:
-            # Encontrar la posición en el texto original
-            pos = self._find_flexible_match_position(text, original)
-            if pos >= 0:
-                # Reemplazar en el texto original
-                before = text[:pos]
-                after = text[pos + len(original):]
-                text = before + replacement + after
-                self.names_replaced += 1
-                logger.debug(f"Flexible replacement: '{original}' -> '{replacement}'")
-        
-        return text
-    
-    def _find_flexible_match_position(self, text: str, pattern: str) -> int:
-        """Encuentra la posición de un patrón de forma flexible"""
-        import re
-        
-        # Crear regex flexible que ignore espacios, guiones y paréntesis en diferentes posiciones
-        pattern_normalized = self._normalize_for_matching(pattern)
+        if not normalized_original:
+            return
         
-        # Buscar secuencias de caracteres que coincidan con el patrón normalizado
-        for i in range(len(text)):
-            for j in range(i + len(pattern_normalized), len(text) + 1):
-                substring = text[i:j]
-                if self._normalize_for_matching(substring) == pattern_normalized:
-                    return i
+        # Buscar el patrón normalizado en el texto normalizado, fuera de tramos ya reemplazados
+        debug = logger.isEnabledFor(logging.DEBUG)
+        replaced = 0
+        search_from = 0
+        while True:
+            pos = normalized_text.find(normalized_original, search_from)
+            if pos < 0:
+                break
+            start = index_map[pos]
+            end = index_map[pos + len(normalized_original) - 1] + 1
+            overlap = next((r for r in replacements if start < r[1] and r[0] < end), None)
+            if overlap is not None:
+                search_from = bisect_left(index_map, overlap[1])
+                continue
+            
+            replacements.append((start, end, replacement))
+            replaced += 1
+            if debug:
+                logger.debug(f"Flexible replacement: '{original}' -> '{replacement}'")
+            search_from = pos + len(normalized_original)
         
-        return -1
+        self.names_replaced += replaced
     
     def _determine_safe_output(self, processed_text: str) -> Tuple[str, str]:
         """
@@ -405,7 +822,8 @@ class WordByWordDeanonymizer:
         if self._has_incomplete_pattern_at_end(processed_text):
             # Si hay un patrón parcial, ser MUCHO más conservador (usuario solicita >21 chars)
             safety_margin = min(120, len(processed_text) // 2)  # Aumentado de 80 a 120
-            logger.debug(f"Patrón parcial detectado, usando margen de seguridad AUMENTADO: {safety_margin}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Patrón parcial detectado, usando margen de seguridad AUMENTADO: {safety_margin}")
         else:
             # Margen normal también aumentado significativamente
             safety_margin = 80  # Aumentado de 40 a 80
@@ -416,15 +834,21 @@ class WordByWordDeanonymizer:
         # 2. BUSCAR PUNTO DE CORTE SEGURO
         safe_cutoff = len(processed_text) - safety_margin
         
-        # Buscar hacia atrás un punto de corte natural
-        for i in range(safe_cutoff, max(0, safe_cutoff - 30), -1):
-            if processed_text[i] in ' \n\t.,;:!)}]':
-                safe_to_send = processed_text[:i + 1]
-                keep_in_buffer = processed_text[i + 1:]
-                
-                # 3. VERIFICACIÓN FINAL: No dividir mappings conocidos
-                if not self._would_split_known_mapping(safe_to_send, keep_in_buffer):
-                    return safe_to_send, keep_in_buffer
+        # Buscar hacia atrás un punto de corte natural (una búsqueda regex sobre una ventana de 30 chars)
+        window_start = max(0, safe_cutoff - 30) + 1
+        window_end = safe_cutoff + 1
+        while window_end > window_start:
+            cut = _CUTOFF_RE.search(processed_text, window_start, window_end)
+            if cut is None:
+                break
+            i = cut.start()
+            
+            # 3. VERIFICACIÓN FINAL: No dividir mappings conocidos
+            if not self._would_split_known_mapping(processed_text, i + 1):
+                return processed_text[:i + 1], processed_text[i + 1:]
+            
+            # Probar el siguiente punto de corte más atrás
+            window_end = i
         
         # Si no encontramos punto seguro, ser más conservador
         emergency_cutoff = len(processed_text) - safety_margin
@@ -442,8 +866,6 @@ class WordByWordDeanonymizer:
         Returns:
             True si hay un patrón potencialmente incompleto
         """
-        import re
-        
         # Analizar los últimos 60 caracteres
         text_end = text[-60:] if len(text) > 60 else text
         
@@ -456,27 +878,12 @@ class WordByWordDeanonymizer:
         if self._has_incomplete_iban_at_end(text_end):
             return True
         
-        # PATRONES PROBLEMÁTICOS que podrían estar incompletos:
-        incomplete_patterns = [
-            # Emails parciales  
-            r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]*$',   # user@domain...
-            r'[a-zA-Z0-9._%+-]+@$',                 # user@
-            
-            # Teléfonos parciales
-            r'\+\d{1,3}[\s\-]*\d{0,3}[\s\-]*\d{0,3}[\s\-]*\d{0,3}$',  # +34 612...
-            r'\(\+\d{1,3}[\s\-]*\d{0,3}[\s\-]*\d{0,3}[\s\-]*\d{0,3}$', # (+34 612...
-            
-            # Números de cuenta/tarjeta parciales
-            r'\d{4}[\s\-]*\d{0,4}[\s\-]*\d{0,4}[\s\-]*\d{0,4}$',      # 1234 5678...
-            
-            # DNI/NIE parciales
-            r'\d{1,8}[A-Z]?$',                      # 12345678...
-        ]
-        
-        for pattern in incomplete_patterns:
-            if re.search(pattern, text_end):
-                logger.debug(f"Patrón incompleto detectado: {pattern} en '{text_end[-20:]}'")
-                return True
+        # PATRONES PROBLEMÁTICOS que podrían estar incompletos (una sola búsqueda)
+        match = _INCOMPLETE_END_RE.search(text_end)
+        if match:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Patrón incompleto detectado: {match.lastgroup} en '{text_end[-20:]}'")
+            return True
         
         return False
     
@@ -490,30 +897,22 @@ class WordByWordDeanonymizer:
         Returns:
             True si hay IBAN incompleto que necesita más datos
         """
-        import re
-        
-        # 🔍 CASOS ESPECÍFICOS PROBLEMÁTICOS (fragmentos sin país)
-        fragment_patterns = [
-            r'\d{2,4}\s+\d{4}\s+\d{4}(\s+\d{1,2})?$',  # "03 4839 3015 63"
-            r'S\d{2}\s+\d{4}\s+\d{4}(\s+\d{1,2})?$',   # "S03 4839 3015 63"
-            r'\d{4}\s+\d{4}\s+\d{2}\s+\d{1,3}$',       # "4839 3015 63 962"
-        ]
-        
-        for pattern in fragment_patterns:
-            if re.search(pattern, text_end):
-                logger.debug(f"Fragmento IBAN detectado: patrón '{pattern}' en '{text_end[-25:]}'")
+        # 🔍 CASOS ESPECÍFICOS PROBLEMÁTICOS (fragmentos sin país, todos terminan en dígito)
+        if _ends_with_digit(text_end):
+            fragment = _IBAN_FRAGMENT_RE.search(text_end)
+            if fragment:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Fragmento IBAN detectado: '{fragment.group()}' en '{text_end[-25:]}'")
                 return True
         
-        # Buscar todos los posibles IBANs en los últimos 60 caracteres
-        iban_patterns = [
-            r'ES\s*\d{2}[\s\d]*',                     # ES33 8565...
-            r'[A-Z]{2}\s*\d{2}[\s\d]*',             # Cualquier país
-            r'[A-Z]{2}\d{2}[\s\d]*',                 # Sin espacios iniciales
-        ]
+        # Sin prefijo de país no hay IBAN posible: evitar los patrones de abajo
+        if not _IBAN_PREFIX_RE.search(text_end):
+            return False
         
-        for pattern in iban_patterns:
+        # Buscar todos los posibles IBANs en los últimos 60 caracteres
+        for pattern in _INCOMPLETE_IBAN_PATTERNS:
             # Buscar todos los matches en el texto
-            matches = list(re.finditer(pattern, text_end))
+            matches = list(pattern.finditer(text_end))
             if not matches:
                 continue
                 
@@ -527,16 +926,19 @@ class WordByWordDeanonymizer:
             if len(text_after_iban) > 40:  # Demasiado texto después, probablemente no es el IBAN del final
                 continue
                 
-            logger.debug(f"Evaluando potencial IBAN: '{potential_iban}' (texto después: '{text_after_iban[:20]}...')")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Evaluando potencial IBAN: '{potential_iban}' (texto después: '{text_after_iban[:20]}...')")
             
             # 🔍 VALIDACIÓN 1: Longitud de caracteres alfanuméricos
-            clean_iban = re.sub(r'[\s\-]', '', potential_iban.upper())
-            logger.debug(f"IBAN limpio: '{clean_iban}' (longitud: {len(clean_iban)})")
+            clean_iban = _WS_DASH_RE.sub('', potential_iban.upper())
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"IBAN limpio: '{clean_iban}' (longitud: {len(clean_iban)})")
             
             # 🎯 ESPAÑOL: Debe tener exactamente 24 caracteres
             if clean_iban.startswith('ES'):
                 if len(clean_iban) < 24:
-                    logger.debug(f"IBAN español INCOMPLETO: {len(clean_iban)}/24 caracteres - SIEMPRE buffer")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"IBAN español INCOMPLETO: {len(clean_iban)}/24 caracteres - SIEMPRE buffer")
                     return True  # ✅ PRIORIDAD MÁXIMA: si no tiene 24 chars, BUFFER SIEMPRE
                 elif len(clean_iban) == 24:
                     # ✅ Longitud correcta, verificar si tiene separador de final
@@ -547,12 +949,14 @@ class WordByWordDeanonymizer:
                         logger.debug("IBAN español 24 chars exactos - está completo, liberando")
                         return False  # ✅ IBAN completo con 24 chars = listo para enviar
                 else:
-                    logger.debug(f"IBAN español demasiado largo: {len(clean_iban)} chars - liberando")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"IBAN español demasiado largo: {len(clean_iban)} chars - liberando")
                     return False  # Más de 24 = no es IBAN español válido
             elif len(clean_iban) >= 2 and clean_iban[:2].isalpha():
                 # 🌍 OTROS PAÍSES: Rangos típicos 15-34 caracteres
                 if len(clean_iban) < 15:
-                    logger.debug(f"IBAN extranjero incompleto: {len(clean_iban)} caracteres")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"IBAN extranjero incompleto: {len(clean_iban)} caracteres")
                     return True
                 elif len(clean_iban) >= 15 and len(clean_iban) <= 34:
                     # Podría estar completo, verificar contexto
@@ -582,28 +986,17 @@ class WordByWordDeanonymizer:
         remaining = text_end[iban_end_pos:] if iban_end_pos < len(text_end) else ""
         
         # ✅ FINALES CLAROS
-        clear_endings = [
-            r'^\s*\n',                  # Nueva línea después
-            r'^\s*[.,:;!?]',           # Puntuación
-            r'^\s*$',                   # Final de texto
-            r'^\s+[a-zA-Z]{2,}',       # Espacio + palabra (no número)
-            r'^\s*[-\)\]\}]',          # Caracteres de cierre
-        ]
-        
-        for ending_pattern in clear_endings:
-            if re.match(ending_pattern, remaining):
-                logger.debug(f"Final claro detectado: patrón '{ending_pattern}'")
+        for ending_pattern in _CLEAR_ENDING_PATTERNS:
+            if ending_pattern.match(remaining):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Final claro detectado: patrón '{ending_pattern.pattern}'")
                 return True
         
         # ❌ FINALES AMBIGUOS (podría continuar)
-        ambiguous_patterns = [
-            r'^\s*\d',                  # Más dígitos después
-            r'^[A-Z0-9]',              # Más caracteres alfanuméricos
-        ]
-        
-        for ambiguous in ambiguous_patterns:
-            if re.match(ambiguous, remaining):
-                logger.debug(f"Final ambiguo detectado: patrón '{ambiguous}'")
+        for ambiguous in _AMBIGUOUS_ENDING_PATTERNS:
+            if ambiguous.match(remaining):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Final ambiguo detectado: patrón '{ambiguous.pattern}'")
                 return False
         
         # Si no hay texto después, considerar final claro
@@ -626,76 +1019,37 @@ class WordByWordDeanonymizer:
         Returns:
             True si detecta IBAN anónimo fragmentado que necesita buffering completo
         """
-        import re
-        
-        # 🔍 PATRONES DE IBAN ANÓNIMO FRAGMENTADO - VERSIÓN AMPLIADA Y AGRESIVA
-        anonymous_iban_patterns = [
-            # Patrones específicos existentes
-            r'ES\d{2}\s+\d{4}\s+\d{4}\s+\d{2}\s+\d{1,3}$',        # ES66 2127 7396 56 5
-            r'ES\d{2}\s+\d{4}\s+\d{4}\s+\d{2}\s+\d{1,4}$',        # ES03 0338 4034 42 5xxx
-            r'[A-Z]{2}\d{2}\s+\d{4}\s+\d{4}\s+\d{2}\s+\d{1,4}$',  # Genérico ampliado
+        # 🔍 PATRONES DE IBAN ANÓNIMO FRAGMENTADO (ver _ANONYMOUS_IBAN_RE)
+        # Todos requieren prefijo de país: sin él se evita la búsqueda
+        match = _ANONYMOUS_IBAN_RE.search(text_end) if _IBAN_PREFIX_RE.search(text_end) else None
+        if match:
+            # Verificar si parece IBAN anónimo (no el real)
+            potential_iban = match.group().strip()
             
-            # Patrones más cortos para detección temprana
-            r'ES\d{2}\s+\d{4}\s+\d{4}$',                          # ES66 2127 7396 (más corto)
-            r'ES\d{2}\s+\d{4}\s+\d{3,4}\s+\d{1,3}$',              # ES03 0338 403x xx x
-            r'[A-Z]{2}\d{2}\s+\d{4}\s+\d{3,4}\s+\d{1,3}$',        # Genérico medio
+            # Limpiar para análisis
+            clean_iban = _WS_DASH_RE.sub('', potential_iban)
             
-            # Patrones muy específicos para casos edge
-            r'[A-Z]{2}\d{2}\s+\d{4}\s+\d{3}\s+\d{2}\s+\d{1}$',    # ES12 3456 789 12 3
-            r'[A-Z]{2}\d{2}\s+\d{4}\s+\d{4}\s+\d{1,2}\s+\d{1,4}$', # Variaciones amplias
-            
-            # NUEVO: Patrones sin espacios (para IBANs concatenados)
-            r'ES\d{2}\d{4}\d{4}\d{2}\d{1,4}$',                    # ES030338403442 + fragmento
-            r'[A-Z]{2}\d{2}\d{4}\d{4}\d{2}\d{1,4}$',              # Genérico sin espacios
-            
-            # NUEVO: Detección ultra-agresiva de cualquier secuencia que empiece como IBAN
-            r'ES\d{2}[\s\d]{10,20}$',                             # ES + 2 dígitos + 10-20 chars
-            r'[A-Z]{2}\d{2}[\s\d]{10,20}$',                       # Cualquier país + patrón similar
-        ]
-        
-        for pattern in anonymous_iban_patterns:
-            if re.search(pattern, text_end):
-                # Verificar si parece IBAN anónimo (no el real)
-                match = re.search(pattern, text_end)
-                potential_iban = match.group().strip()
-                
-                # Limpiar para análisis
-                clean_iban = re.sub(r'[\s\-]', '', potential_iban)
-                
-                # ✅ Si es IBAN español pero tiene longitud incorrecta -> probablemente anónimo
-                if clean_iban.startswith('ES') and len(clean_iban) != 24:
+            # ✅ Si es IBAN español pero tiene longitud incorrecta -> probablemente anónimo
+            if clean_iban.startswith('ES') and len(clean_iban) != 24:
+                if logger.isEnabledFor(logging.DEBUG):
                     logger.debug(f"IBAN anónimo fragmentado detectado: '{potential_iban}' ({len(clean_iban)} chars)")
-                    return True
-                
-                # ✅ Si parece IBAN pero no pasa validación -> probablemente anónimo
-                if not self._is_likely_real_iban(clean_iban):
+                return True
+            
+            # ✅ Si parece IBAN pero no pasa validación -> probablemente anónimo
+            if not self._is_likely_real_iban(clean_iban):
+                if logger.isEnabledFor(logging.DEBUG):
                     logger.debug(f"IBAN anónimo fragmentado (no válido): '{potential_iban}'")
-                    return True
+                return True
         
-        # 🔍 DETECTAR TOKENS DE CONTINUACIÓN - VERSIÓN AMPLIADA
-        # Patrones que podrían completar un IBAN anónimo fragmentado
-        continuation_patterns = [
-            # Patrones telefónicos que suelen ser tokens de continuación
-            r'\(\d{3}\)-\d{3}-\d{3}$',           # (328)-565-308
-            r'\d{3}-\d{3}-\d{3}$',               # 328-565-308
-            r'\(\d{3}\)\s?\d{3}-?\d{3}$',        # (328) 565-308 o (328)565308
-            
-            # Secuencias numéricas largas (posibles tokens IBAN)
-            r'\d{8,15}$',                        # 247719739 (ampliado de 12 a 15)
-            r'\d{6,10}$',                        # Números medianos también
-            
-            # NUEVO: Patrones específicos de finalización IBAN
-            r'\d{4}\d{4}\d{4}$',                 # 1234567890123 (3 grupos de 4)
-            r'\d{2,4}\d{4,8}$',                  # Patrones variables
-            
-            # NUEVO: Detección ultra-agresiva - cualquier secuencia numérica al final
-            r'\d{5,}$',                          # 5 o más dígitos consecutivos
-        ]
+        # 🔍 DETECTAR TOKENS DE CONTINUACIÓN (ver _CONTINUATION_RE, todas las ramas terminan en dígito)
+        if not _ends_with_digit(text_end):
+            return False
         
-        for pattern in continuation_patterns:
-            if re.search(pattern, text_end):
-                logger.debug(f"Token de continuación IBAN detectado: patrón '{pattern}'")
-                return True
+        continuation = _CONTINUATION_RE.search(text_end)
+        if continuation:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Token de continuación IBAN detectado: '{continuation.group()}'")
+            return True
         
         return False
     
@@ -712,14 +1066,7 @@ class WordByWordDeanonymizer:
                 return False
             
             # Verificación básica de dígitos de control
-            try:
-                # Algoritmo IBAN simplificado
-                rearr = clean_iban[4:] + clean_iban[:4]
-                converted = ''.join(str(ord(c) - 55) if c.isalpha() else c for c in rearr)
-                remainder = int(converted) % 97
-                return remainder == 1
-            except:
-                return False
+            return _iban_checksum_ok(clean_iban)
         
         return True  # Por defecto, asumir que es real si no es español
     
@@ -731,46 +1078,54 @@ class WordByWordDeanonymizer:
         Returns:
             True si contiene IBAN real completo que debe enviarse ya
         """
-        import re
-        
         # Buscar patrones de IBAN completo español
-        iban_pattern = r'ES\d{2}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}\s+\d{4}'
-        matches = re.finditer(iban_pattern, text)
-        
-        for match in matches:
+        for match in _IBAN_COMPLETE_RE.finditer(text):
             iban_candidate = match.group().strip()
-            clean_iban = re.sub(r'[\s\-]', '', iban_candidate)
+            clean_iban = _WS_DASH_RE.sub('', iban_candidate)
             
             # Verificar si es IBAN real válido
             if self._is_likely_real_iban(clean_iban):
                 # Además, verificar si este IBAN está en nuestros valores de mapping (lado real)
                 if clean_iban in self.inverted_mapping or iban_candidate in self.inverted_mapping:
-                    logger.debug(f"IBAN real completo identificado para envío: '{iban_candidate}'")
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"IBAN real completo identificado para envío: '{iban_candidate}'")
                     return True
         
         return False
     
-    def _would_split_known_mapping(self, safe_part: str, buffer_part: str) -> bool:
+    def _would_split_known_mapping(self, text: str, cut: int) -> bool:
         """
-        Verifica si enviar safe_part y mantener buffer_part dividiría un mapping conocido
+        Verifica si cortar text en cut (enviar text[:cut], mantener text[cut:]) dividiría un mapping conocido
+        
+        Analiza la zona de unión (30 caracteres a cada lado) directamente sobre text,
+        sin crear subcadenas.
         
         Returns:
             True si detecta que se dividiría un mapping
         """
-        # Crear zona de unión para análisis
-        junction_zone = safe_part[-30:] + buffer_part[:30]
-        
-        # Verificar cada mapping conocido
-        for fake_token in self.mapping.keys():
-            if fake_token in junction_zone:
-                # Encontrar posición del token en la zona de unión
-                token_pos = junction_zone.find(fake_token)
-                token_end = token_pos + len(fake_token)
-                safe_part_len = len(safe_part[-30:])
-                
-                # Si el token se divide entre safe_part y buffer_part
-                if token_pos < safe_part_len < token_end:
-                    logger.debug(f"Evitando división de mapping: '{fake_token}'")
+        zone_start = max(0, cut - 30)
+        zone_end = min(len(text), cut + 30)
+        
+        # Un token se dividiría si empieza antes del corte y termina después
+        if self._ac is not None:
+            # Una sola pasada del autómata: todas las apariciones, también solapadas
+            for end, (length, _) in self._ac.iter(text, zone_start, zone_end):
+                if end - length + 1 < cut <= end:
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"Evitando división de mapping: '{text[end - length + 1:end + 1]}'")
+                    return True
+        elif self._exact_re is not None:
+            # La alternancia prueba primero los tokens largos: en cada inicio devuelve el
+            # token más largo, que es el que antes cruzaría el corte. Solo se prueban
+            # los inicios con un carácter inicial de token
+            initials = self._token_initials
+            for start in range(zone_start, cut):
+                if text[start] not in initials:
+                    continue
+                match = self._exact_re.match(text, start, zone_end)
+                if match and match.end() > cut:
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug(f"Evitando división de mapping: '{match.group()}'")
                     return True
         
         return False
@@ -780,13 +1135,9 @@ class WordByWordDeanonymizer:
         # Usar el método original como fallback
         self.partial_word += chunk
         
-        # Aplicar reemplazos básicos
-        remaining_text = self.partial_word
-        
-        for fake_token, real_value in self.mapping.items():
-            if fake_token in remaining_text:
-                remaining_text = remaining_text.replace(fake_token, real_value)
-                self.names_replaced += 1
+        # Aplicar reemplazos básicos en una sola pasada
+        remaining_text, replaced_count = self._replace_exact_tokens(self.partial_word)
+        self.names_replaced += replaced_count
         
         self.partial_word = ""
         return remaining_text
@@ -795,140 +1146,81 @@ class WordByWordDeanonymizer:
         """
         Aplica reemplazos inteligentes para teléfonos que pueden venir en diferentes formatos
         """
-        import re
-        
-        # Detectar patrones de teléfono en el texto con mayor precisión
-        phone_patterns = [
-            r'\(\+\d{1,3}\)\s*\d{3}-\d{3}-\d{3}',  # (+34) 793-914-603
-            r'\(\+\d{1,3}-\d{3}-\d{3}-\d{3}\)',    # (+34-677-977-056)
-            r'\+\d{1,3}-\d{3}-\d{3}-\d{3}',        # +34-652-433-881
-            r'\+\d{1,3}\s+\d{3}\s+\d{3}\s+\d{3}',  # +34 612 345 678
-            r'\d{3}\s+\d{3}\s+\d{3}',              # 793 914 603
-            r'\d{3}-\d{3}-\d{3}',                  # 793-914-603
-            r'\+\d{1,3}\s?\d{6,}',                 # Internacional genérico
-        ]
-        
-        # PATRÓN PELIGROSO COMPLETAMENTE REMOVIDO: r'\d{9}' causa conflictos con IBANs
-        # Los patrones de 9 dígitos son demasiado agresivos y confunden partes de IBANs con teléfonos
-        # La detección contextual no es suficiente porque el patrón ya asume que es "seguro"
-        safe_9_digit_patterns = [
-            # PATRÓN REMOVIDO: r'(?<!\d)\d{9}(?!\d)' - Causa conflictos con IBANs
-            # Solo mantener patrones con formato específico de teléfono
-        ]
-        
-        # Buscar y reemplazar teléfonos (patrones seguros)
-        all_patterns = phone_patterns + safe_9_digit_patterns
-        
-        for pattern in all_patterns:
-            matches = list(re.finditer(pattern, text))
+        # Reunir reemplazos (inicio, fin, valor) y reconstruir el texto una sola vez al final
+        replacements = []
+        debug = logger.isEnabledFor(logging.DEBUG)
+        
+        # Buscar y reemplazar teléfonos en una sola pasada (ver _SMART_PHONE_RE). Tras un
+        # reemplazo se sigue desde su final; si se descarta, desde el carácter siguiente, para
+        # que un formato más corto dentro del mismo tramo pueda coincidir
+        pos = 0
+        while True:
+            match = _SMART_PHONE_RE.search(text, pos)
+            if match is None:
+                break
+            found_phone = match.group()
+            start, end = match.span()
+            pos = start + 1
             
-            # Procesar coincidencias en orden inverso para no afectar posiciones
-            for match in reversed(matches):
-                found_phone = match.group()
-                
-                # VERIFICACIÓN ANTI-CONFLICTO: No procesar dígitos que puedan ser parte de IBAN
-                if self._is_part_of_iban_context(text, match.start(), match.end()):
+            # VERIFICACIÓN ANTI-CONFLICTO: No procesar dígitos que puedan ser parte de IBAN
+            if self._is_part_of_iban_context(text, start, end):
+                if debug:
                     logger.debug(f"Skipping phone pattern '{found_phone}' - detected as part of IBAN context")
-                    continue
-                
-                # Normalizar el teléfono encontrado (solo dígitos)
-                found_digits = ''.join(filter(str.isdigit, found_phone))
-                
-                # Buscar en el mapping todos los posibles teléfonos
-                best_match = None
-                best_replacement = None
-                
-                for fake_token, real_phone in self.mapping.items():
-                    # Normalizar el token del mapping
-                    fake_digits = ''.join(filter(str.isdigit, fake_token))
-                    
-                    # Diferentes niveles de coincidencia
-                    if self._phone_digits_match(found_digits, fake_digits):
-                        # Si encontramos una coincidencia, usar este replacement
-                        best_match = fake_token
-                        best_replacement = real_phone
-                        break
-                
-                # Si encontramos una coincidencia, hacer el reemplazo
-                if best_match and best_replacement:
-                    # Reemplazar en el texto original
-                    text = text[:match.start()] + best_replacement + text[match.end():]
-                    self.names_replaced += 1
+                continue
+            
+            # Normalizar el teléfono encontrado (solo dígitos)
+            found_digits = _extract_digits(found_phone)
+            
+            # Buscar el teléfono en los índices precalculados: primero por todos sus dígitos
+            # (distingue prefijos de país), después por los últimos 9 y 7
+            hit = (self._phone_by_digits.get(found_digits)
+                   or self._phone_by_tail9.get(found_digits[-9:])
+                   or self._phone_by_tail7.get(found_digits[-7:]))
+            best_match, best_replacement = hit if hit else (None, None)
+            
+            # Si encontramos una coincidencia, hacer el reemplazo
+            if best_match and best_replacement:
+                replacements.append((start, end, best_replacement))
+                pos = end
+                if debug:
                     logger.debug(f"Smart phone replacement: '{found_phone}' -> '{best_replacement}' (matched digits from '{best_match}')")
         
-        return text
-    
-    def _phone_digits_match(self, found_digits: str, mapping_digits: str) -> bool:
-        """
-        Verifica si los dígitos de dos teléfonos coinciden usando diferentes estrategias
-        """
-        if not found_digits or not mapping_digits:
-            return False
-        
-        # 1. Coincidencia exacta de todos los dígitos
-        if found_digits == mapping_digits:
-            return True
-        
-        # 2. Coincidencia de los últimos 9 dígitos (números españoles)
-        if len(found_digits) >= 9 and len(mapping_digits) >= 9:
-            if found_digits[-9:] == mapping_digits[-9:]:
-                return True
-        
-        # 3. Coincidencia de los últimos 7-8 dígitos (casos especiales)
-        if len(found_digits) >= 7 and len(mapping_digits) >= 7:
-            if found_digits[-7:] == mapping_digits[-7:]:
-                return True
-        
-        # 4. Si uno incluye al otro (para casos como +34 vs sin prefijo)
-        if found_digits in mapping_digits or mapping_digits in found_digits:
-            return True
-        
-        return False
+        self.names_replaced += len(replacements)
+        return _join_replacements(text, replacements)
     
     def _is_part_of_iban_context(self, text: str, start: int, end: int) -> bool:
         """
         Verifica si una secuencia de dígitos está en contexto de IBAN para evitar conflictos
         """
-        import re
-        
         # Examinar contexto antes y después (50 caracteres cada lado)
         context_start = max(0, start - 50)
         context_end = min(len(text), end + 50)
         context = text[context_start:context_end]
         
-        # Buscar patrones que indican contexto de IBAN
-        iban_indicators = [
-            r'cuenta\s+bancaria',
-            r'número\s+de\s+cuenta',
-            r'IBAN',
-            r'ES\d{2}[\s\d]+',           # Patrón IBAN español
-            r'[A-Z]{2}\d{2}[\s\d]+',     # Patrón IBAN genérico
-        ]
-        
-        for pattern in iban_indicators:
-            if re.search(pattern, context, re.IGNORECASE):
-                logger.debug(f"IBAN context detected: pattern '{pattern}' in context")
-                return True
+        # Buscar patrones que indican contexto de IBAN (una sola búsqueda)
+        indicator = _IBAN_CONTEXT_RE.search(context)
+        if indicator:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"IBAN context detected: '{indicator.group()}' in context")
+            return True
         
         # Verificar si hay código país de IBAN cerca
         before_context = text[max(0, start - 30):start]
-        if re.search(r'ES\s*\d{0,2}[\s\d]*$', before_context):
-            logger.debug(f"IBAN prefix detected in before context: '{before_context[-20:]}'")
+        if _IBAN_BEFORE_CONTEXT_RE.search(before_context):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"IBAN prefix detected in before context: '{before_context[-20:]}'")
             return True
         
         return False
     
     def _looks_like_phone_token(self, token: str) -> bool:
         """Verifica si un token parece de teléfono"""
-        return '[PHONE_' in token.upper() or '[TEL_' in token.upper()
+        return _PHONE_TOKEN_RE.search(token) is not None
     
     def _looks_like_phone_value(self, value: str) -> bool:
         """Verifica si un valor parece un teléfono"""
-        import re
-        # Patrones de teléfono
-        phone_regex = r'(\+?\d[\d\s\-()]{6,}\d)'
-        digits = ''.join(filter(str.isdigit, value))
-        return bool(re.search(phone_regex, value)) and len(digits) >= 7
+        digits = _extract_digits(value)
+        return bool(_PHONE_VALUE_RE.search(value)) and len(digits) >= 7
     
     def flush_remaining(self) -> str:
         """
@@ -937,37 +1229,34 @@ class WordByWordDeanonymizer:
         Returns:
             Texto final procesado
         """
+        self._ensure_exact_matcher()
+        
         # Procesar tanto el buffer inteligente como el buffer de palabras
         final_text = ""
         
         # Procesar el smart_buffer si tiene contenido
-        if self.smart_buffer:
+        if self._buf:
             # Aplicar todos los reemplazos al buffer final
-            buffer_text = self.smart_buffer
+            buffer_text = ''.join(self._buf)
             
-            # Reemplazos exactos
-            for fake_token, real_value in self.mapping.items():
-                if fake_token in buffer_text:
-                    buffer_text = buffer_text.replace(fake_token, real_value)
-                    self.names_replaced += 1
-                    logger.debug(f"Final replacement: '{fake_token}' -> '{real_value}'")
+            # Reemplazos exactos en una sola pasada
+            buffer_text, replaced_count = self._replace_exact_tokens(buffer_text)
+            self.names_replaced += replaced_count
             
             # Reemplazos inteligentes
             buffer_text = self._smart_complex_replacement(buffer_text)
             
             final_text += buffer_text
-            self.smart_buffer = ""
+            self._buf.clear()
+            self._buf_len = 0
         
         # Procesar el partial_word si tiene contenido (compatibilidad)
         if self.partial_word:
             remaining_text = self.partial_word
             
-            # Buscar y reemplazar tokens anonimizados completos
-            for fake_token, real_value in self.mapping.items():
-                if fake_token in remaining_text:
-                    remaining_text = remaining_text.replace(fake_token, real_value)
-                    self.names_replaced += 1
-                    logger.debug(f"Final partial replacement: '{fake_token}' -> '{real_value}'")
+            # Buscar y reemplazar tokens anonimizados completos en una sola pasada
+            remaining_text, replaced_count = self._replace_exact_tokens(remaining_text)
+            self.names_replaced += replaced_count
             
             # Aplicar reemplazos inteligentes de teléfonos en el flush final
             remaining_text = self._smart_phone_replacement(remaining_text)
@@ -979,7 +1268,10 @@ class WordByWordDeanonymizer:
     
     def _is_word_separator(self, char: str) -> bool:
         """Verifica si un carácter es separador de palabras"""
-        return char.isspace() or char in '.,!?;:()[]{}"\'-/\\|<>=+*&%$#@'
+        code = ord(char)
+        if code < 128:
+            return bool(_SEP_TABLE[code])
+        return char.isspace()
     
     def _can_send_immediately(self, partial: str) -> bool:
         """
@@ -995,10 +1287,12 @@ class WordByWordDeanonymizer:
         if len(partial) < 2:
             return False
         
-        # Verificar si es un prefijo de algún token anonimizado
-        for fake_token in self.mapping.keys():
-            if fake_token.startswith(partial):
-                return False  # Es prefijo de un token, esperar más
+        # Verificar si es un prefijo de algún token anonimizado: el primer token
+        # ordenado >= partial es el único candidato a empezar por partial
+        self._ensure_exact_matcher()
+        index = bisect_left(self._sorted_tokens, partial)
+        if index < len(self._sorted_tokens) and self._sorted_tokens[index].startswith(partial):
+            return False  # Es prefijo de un token, esperar más
         
         # No es prefijo de ningún token, puede enviarse inmediatamente
         return True
@@ -1022,7 +1316,8 @@ class WordByWordDeanonymizer:
         if word in self.mapping:
             replacement = self.mapping[word]
             self.names_replaced += 1
-            logger.debug(f"Direct replacement: '{original_word}' -> '{replacement}'")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Direct replacement: '{original_word}' -> '{replacement}'")
             return replacement
         
         # Si no hay reemplazo, devolver palabra original
@@ -1081,13 +1376,14 @@ class WordByWordDeanonymizer:
         Returns:
             Estado actual del deanonimizador
         """
+        self._ensure_exact_matcher()
         return {
             "partial_word": self.partial_word,
             "smart_buffer": self.smart_buffer,
             "smart_buffer_size": len(self.smart_buffer),
             "mapping_count": len(self.mapping),
             "complex_patterns_count": len(self.complex_patterns) if hasattr(self, 'complex_patterns') else 0,
-            "name_prefixes_count": len(self.name_prefixes),
+            "indexed_tokens_count": len(self._sorted_tokens),
             "stats": self.get_stats()
         }
 
@@ -1097,8 +1393,12 @@ class WordByWordStreamProcessor:
     Procesador de streaming que utiliza WordByWordDeanonymizer
     """
     
+    # Caracteres de fin de palabra que permiten procesar lo acumulado sin esperar más
+    FLUSH_ENDINGS = (' ', '\n', '.', ',', ';')
+    
     def __init__(self, mapping: Dict[str, str]):
         self.deanonymizer = WordByWordDeanonymizer(mapping)
+        self.coalesce_size = 64  # Acumular chunks pequeños del LLM hasta este tamaño
     
     async def process_stream(self, llm_stream, session_id: str):
         """
@@ -1109,23 +1409,33 @@ class WordByWordStreamProcessor:
             session_id: ID de sesión para logging
             
         Yields:
-            Chunks procesados con deanonimización
+            Frames SSE en bytes con los chunks procesados con deanonimización
         """
         chunk_count = 0
         total_chars = 0
+        pending = []
+        pending_size = 0
         
         try:
             async for chunk in llm_stream:
                 if chunk:
-                    # Procesar chunk palabra por palabra
-                    processed_chunk = self.deanonymizer.process_chunk(chunk)
+                    # Acumular chunks pequeños hasta un fin de palabra o el tamaño mínimo
+                    pending.append(chunk)
+                    pending_size += len(chunk)
+                    if pending_size < self.coalesce_size and not chunk.endswith(self.FLUSH_ENDINGS):
+                        continue
+                    
+                    # Procesar lo acumulado en una sola llamada
+                    processed_chunk = self.deanonymizer.process_chunks(pending)
+                    pending = []
+                    pending_size = 0
                     
                     if processed_chunk:
                         chunk_count += 1
                         total_chars += len(processed_chunk)
                         
                         # Enviar chunk procesado
-                        yield f"data: {processed_chunk}\n\n"
+                        yield _SSE_PREFIX + processed_chunk.encode('utf-8') + _SSE_SUFFIX
                         
                         # Log cada 50 chunks para debugging
                         if chunk_count % 50 == 0:
@@ -1133,10 +1443,11 @@ class WordByWordStreamProcessor:
                             logger.debug(f"Session {session_id}: Processed {chunk_count} chunks, "
                                        f"{total_chars} chars, {stats['names_replaced']} replacements")
             
-            # Procesar cualquier palabra parcial restante
-            remaining = self.deanonymizer.flush_remaining()
+            # Procesar lo que quede acumulado y cualquier palabra parcial restante
+            remaining = self.deanonymizer.process_chunks(pending) if pending else ""
+            remaining += self.deanonymizer.flush_remaining()
             if remaining:
-                yield f"data: {remaining}\n\n"
+                yield _SSE_PREFIX + remaining.encode('utf-8') + _SSE_SUFFIX
             
             # Log final
             final_stats = self.deanonymizer.get_stats()
@@ -7,12 +7,53 @@ for data processing, validation, and formatting.
 
 import re
 import hashlib
+import math
 import secrets
 import string
+import time
+from collections import Counter
+from functools import lru_cache
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 
 
+# Exact types safe_json_serialize returns untouched (checked before any recursion)
+_JSON_PRIMITIVES = frozenset({str, int, float, bool, type(None)})
+
+# Extensions recognised by is_image_file / is_document_file
+_IMAGE_EXTENSIONS = frozenset({'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp', 'tiff', 'svg'})
+_DOCUMENT_EXTENSIONS = frozenset({'pdf', 'doc', 'docx', 'xls', 'xlsx', 'txt', 'rtf', 'odt'})
+
+# Units used by format_file_size, one per power of 1024
+_FILE_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# Sensitive patterns masked by clean_text_for_logging, fused into one pass.
+# Group names double as the replacement tag ([DNI], [EMAIL], [PHONE]).
+_PII_RE = re.compile(
+    r'(?P<DNI>\b\d{8}[A-Z]\b)'
+    r'|(?P<EMAIL>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)'
+    r'|(?P<PHONE>\b\d{9}\b)'
+)
+
+
+def _pii_tag(match: re.Match) -> str:
+    """Replacement tag for a _PII_RE match, named after the group that matched."""
+    return f"[{match.lastgroup}]"
+
+
+# Characters allowed in a session ID, and a table deleting every other ASCII character
+_SESSION_ID_CHARS = frozenset(string.ascii_letters + string.digits + '_-')
+_SESSION_ID_STRIP = str.maketrans('', '', ''.join(
+    chr(c) for c in range(128) if chr(c) not in _SESSION_ID_CHARS
+))
+
+# Characters removed by sanitize_filename: translate table for ASCII, regex for the rest
+_FILENAME_UNSAFE_RE = re.compile(r'[^\w\s\-\.]')
+_FILENAME_STRIP = str.maketrans('', '', ''.join(
+    chr(c) for c in range(128) if _FILENAME_UNSAFE_RE.match(chr(c))
+))
+
+
 def generate_session_id(prefix: str = "session") -> str:
     """
     Generate a secure random session ID.
@@ -23,12 +64,11 @@ def generate_session_id(prefix: str = "session") -> str:
     Returns:
         str: Generated session ID
     """
-    # Generate random string
-    alphabet = string.ascii_letters + string.digits
-    random_part = ''.join(secrets.choice(alphabet) for _ in range(16))
+    # Generate random string (16 URL-safe chars, valid for validate_session_id_format)
+    random_part = secrets.token_urlsafe(12)
     
-    # Add timestamp for uniqueness
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+    # Add timestamp for uniqueness (local time, same as datetime.now())
+    timestamp = time.strftime("%Y%m%d%H%M%S")
     
     return f"{prefix}_{timestamp}_{random_part}"
 
@@ -44,7 +84,10 @@ def sanitize_session_id(session_id: str) -> str:
         str: Sanitized session ID
     """
     # Remove invalid characters, keep only alphanumeric, underscore, hyphen
-    sanitized = re.sub(r'[^a-zA-Z0-9_\-]', '', session_id)
+    # (ASCII via translate table; any non-ASCII leftovers are dropped separately)
+    sanitized = session_id.translate(_SESSION_ID_STRIP)
+    if not sanitized.isascii():
+        sanitized = ''.join(c for c in sanitized if c in _SESSION_ID_CHARS)
     
     # Truncate if too long
     if len(sanitized) > 128:
@@ -53,6 +96,7 @@ def sanitize_session_id(session_id: str) -> str:
     return sanitized
 
 
+@lru_cache(maxsize=1024, typed=True)
 def format_duration(seconds: int) -> str:
     """
     Format duration in seconds to human-readable string.
@@ -66,25 +110,18 @@ def format_duration(seconds: int) -> str:
     if seconds < 0:
         return "expired"
     
-    if seconds < 60:
-        return f"{seconds} seconds"
-    
-    minutes = seconds // 60
-    remaining_seconds = seconds % 60
-    
-    if minutes < 60:
-        return f"{minutes} minutes {remaining_seconds} seconds"
-    
-    hours = minutes // 60
-    remaining_minutes = minutes % 60
+    # Single divmod chain; the largest non-zero unit picks the format
+    minutes, remaining_seconds = divmod(seconds, 60)
+    hours, remaining_minutes = divmod(minutes, 60)
+    days, remaining_hours = divmod(hours, 24)
     
-    if hours < 24:
+    if days:
+        return f"{days} days {remaining_hours} hours"
+    if hours:
         return f"{hours} hours {remaining_minutes} minutes"
-    
-    days = hours // 24
-    remaining_hours = hours % 24
-    
-    return f"{days} days {remaining_hours} hours"
+    if minutes:
+        return f"{minutes} minutes {remaining_seconds} seconds"
+    return f"{seconds} seconds"
 
 
 def hash_sensitive_data(data: str, salt: Optional[str] = None) -> str:
@@ -101,11 +138,27 @@ def hash_sensitive_data(data: str, salt: Optional[str] = None) -> str:
     if salt is None:
         salt = secrets.token_hex(16)
     
-    # Create hash
-    hash_object = hashlib.sha256()
-    hash_object.update(f"{data}{salt}".encode('utf-8'))
+    # One-shot hash (hashlib's OpenSSL backend uses SHA-NI when the CPU has it)
+    return hashlib.sha256(data.encode('utf-8') + salt.encode('utf-8')).hexdigest()
+
+
+def hash_many_with_salt(values: List[str], salt: str) -> List[str]:
+    """
+    Hash several values with the same salt.
+    
+    Equivalent to calling hash_sensitive_data(value, salt) for each value,
+    but the salt is encoded only once for the whole batch.
     
-    return hash_object.hexdigest()
+    Args:
+        values (List[str]): Sensitive values to hash
+        salt (str): Salt shared by all values
+        
+    Returns:
+        List[str]: Hashed values, in the same order
+    """
+    salt_bytes = salt.encode('utf-8')
+    sha256 = hashlib.sha256
+    return [sha256(value.encode('utf-8') + salt_bytes).hexdigest() for value in values]
 
 
 def mask_sensitive_value(value: str, mask_char: str = "*", visible_chars: int = 3) -> str:
@@ -120,14 +173,12 @@ def mask_sensitive_value(value: str, mask_char: str = "*", visible_chars: int =
     Returns:
         str: Masked value
     """
-    if len(value) <= visible_chars * 2:
-        return mask_char * len(value)
-    
-    start = value[:visible_chars]
-    end = value[-visible_chars:]
-    middle = mask_char * (len(value) - visible_chars * 2)
+    length = len(value)
+    hidden = length - visible_chars * 2
+    if hidden <= 0:
+        return mask_char * length
     
-    return f"{start}{middle}{end}"
+    return ''.join((value[:visible_chars], mask_char * hidden, value[-visible_chars:]))
 
 
 def validate_ttl(ttl: Optional[int], min_ttl: int = 60, max_ttl: int = 86400) -> int:
@@ -170,11 +221,21 @@ def safe_json_serialize(obj: Any) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: JSON-compatible dictionary
     """
-    if isinstance(obj, dict):
-        return {k: safe_json_serialize(v) for k, v in obj.items()}
+    # Primitive children are copied inline, only containers and other objects recurse
+    if type(obj) in _JSON_PRIMITIVES:
+        return obj
+    
+    elif isinstance(obj, dict):
+        return {
+            k: v if type(v) in _JSON_PRIMITIVES else safe_json_serialize(v)
+            for k, v in obj.items()
+        }
     
     elif isinstance(obj, list):
-        return [safe_json_serialize(item) for item in obj]
+        return [
+            item if type(item) in _JSON_PRIMITIVES else safe_json_serialize(item)
+            for item in obj
+        ]
     
     elif isinstance(obj, datetime):
         return obj.isoformat()
@@ -202,9 +263,7 @@ def clean_text_for_logging(text: str, max_length: int = 100) -> str:
     
     # Remove sensitive patterns (basic implementation)
     # This could be enhanced with PII detection
-    cleaned = re.sub(r'\b\d{8}[A-Z]\b', '[DNI]', text)  # DNI pattern
-    cleaned = re.sub(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', '[EMAIL]', cleaned)  # Email
-    cleaned = re.sub(r'\b\d{9}\b', '[PHONE]', cleaned)  # Phone pattern
+    cleaned = _PII_RE.sub(_pii_tag, text)  # DNI, email and phone patterns
     
     # Truncate if too long
     if len(cleaned) > max_length:
@@ -223,34 +282,41 @@ def extract_entities_summary(entities: List[Dict[str, Any]]) -> Dict[str, int]:
     Returns:
         Dict[str, int]: Count of entities by type
     """
-    summary = {}
-    for entity in entities:
-        entity_type = entity.get('entity_type', 'UNKNOWN')
-        summary[entity_type] = summary.get(entity_type, 0) + 1
-    
-    return summary
+    return dict(Counter([entity.get('entity_type', 'UNKNOWN') for entity in entities]))
 
+@lru_cache(maxsize=1024)
 def validate_session_id_format(session_id: str) -> bool:
 
     if not session_id or not session_id.strip():
         return False
     
-    pattern = r'^[a-zA-Z0-9_\-]+$'
-    return bool(re.match(pattern, session_id))
+    return _SESSION_ID_CHARS.issuperset(session_id)
 
 
+@lru_cache(maxsize=1024, typed=True)
 def format_file_size(size_bytes: int) -> str:
 
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size_bytes < 1024.0:
-            return f"{size_bytes:.2f} {unit}"
-        size_bytes /= 1024.0
-    return f"{size_bytes:.2f} TB"
+    if size_bytes < 1024:
+        return f"{size_bytes:.2f} B"
+    
+    # Unit index from the binary exponent (exact, unlike math.log at 1024**n boundaries)
+    if isinstance(size_bytes, int):
+        exponent = size_bytes.bit_length() - 1
+    elif math.isfinite(size_bytes):
+        exponent = math.frexp(size_bytes)[1] - 1
+    else:
+        exponent = 40
+    index = min(exponent // 10, len(_FILE_SIZE_UNITS) - 1)
+    
+    return f"{size_bytes / (1 << (10 * index)):.2f} {_FILE_SIZE_UNITS[index]}"
 
 
+@lru_cache(maxsize=1024)
 def sanitize_filename(filename: str) -> str:
 
-    safe_name = re.sub(r'[^\w\s\-\.]', '', filename)
+    safe_name = filename.translate(_FILENAME_STRIP)
+    if not safe_name.isascii():
+        safe_name = _FILENAME_UNSAFE_RE.sub('', safe_name)
     
     if len(safe_name) > 255:
         name, ext = safe_name.rsplit('.', 1) if '.' in safe_name else (safe_name, '')
@@ -259,25 +325,23 @@ def sanitize_filename(filename: str) -> str:
     return safe_name
 
 
+@lru_cache(maxsize=1024)
 def extract_file_extension(filename: str) -> str:
 
-    if '.' in filename:
-        return filename.rsplit('.', 1)[1].lower()
-    return ''
+    _, dot, ext = filename.rpartition('.')
+    return ext.lower() if dot else ''
 
 
+@lru_cache(maxsize=1024)
 def is_image_file(filename: str) -> bool:
 
-    image_extensions = {'jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp', 'tiff', 'svg'}
-    ext = extract_file_extension(filename)
-    return ext in image_extensions
+    return extract_file_extension(filename) in _IMAGE_EXTENSIONS
 
 
+@lru_cache(maxsize=1024)
 def is_document_file(filename: str) -> bool:
 
-    document_extensions = {'pdf', 'doc', 'docx', 'xls', 'xlsx', 'txt', 'rtf', 'odt'}
-    ext = extract_file_extension(filename)
-    return ext in document_extensions
+    return extract_file_extension(filename) in _DOCUMENT_EXTENSIONS
 
 
 # Export utility functions
@@ -286,11 +350,12 @@ __all__ = [
     "sanitize_session_id",
     "format_duration",
     "hash_sensitive_data",
+    "hash_many_with_salt",
     "mask_sensitive_value", 
     "validate_ttl",
     "safe_json_serialize",
     "clean_text_for_logging",
-    "extract_entities_summary"
+    "extract_entities_summary",
     "validate_session_id_format",
     "format_file_size",
     "sanitize_filename",
@@ -1,8 +1,21 @@
 import requests
 import json
+import sys
 import asyncio
 import aiohttp
-from typing import Dict
+from typing import AsyncIterator, Dict
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Ambos aceptan bytes, así que las líneas SSE no se decodifican antes de parsear
+_json_loads = orjson.loads if ORJSON_AVAILABLE else json.loads
+
+# Bytes de salida acumulados antes de escribir en stdout durante el streaming
+STDOUT_FLUSH_BYTES = 4096
 
 class ShieldAITestClient:
     """
@@ -11,12 +24,39 @@ class ShieldAITestClient:
     
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url
+        # Conexiones reutilizadas entre llamadas (keep-alive)
+        self._http = requests.Session()
+        self._aio_session = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Devuelve la sesión aiohttp compartida, creándola la primera vez
+        """
+        if self._aio_session is None or self._aio_session.closed:
+            self._aio_session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300)
+            )
+        return self._aio_session
+    
+    async def aclose(self):
+        """
+        Cierra la sesión aiohttp compartida
+        """
+        if self._aio_session is not None and not self._aio_session.closed:
+            await self._aio_session.close()
+        self._aio_session = None
+    
+    def close(self):
+        """
+        Cierra la sesión HTTP síncrona
+        """
+        self._http.close()
     
     def setup_dummy_session(self, session_id: str) -> Dict:
         """
         Configura una sesión dummy con datos de prueba
         """
-        response = requests.post(f"{self.base_url}/sessions/{session_id}/setup-dummy")
+        response = self._http.post(f"{self.base_url}/sessions/{session_id}/setup-dummy")
         return response.json()
     
     def deanonymize_text(self, session_id: str, model_response: str) -> Dict:
@@ -27,9 +67,19 @@ class ShieldAITestClient:
             "session_id": session_id,
             "model_response": model_response
         }
-        response = requests.post(f"{self.base_url}/deanonymize/", json=payload)
+        response = self._http.post(f"{self.base_url}/deanonymize/", json=payload)
         return response.json()
     
+    @staticmethod
+    async def _iter_sse_data(response) -> AsyncIterator[bytes]:
+        """
+        Devuelve el payload (bytes) de cada línea 'data: ' del stream SSE
+        """
+        async for line in response.content:
+            line = line.strip()
+            if line.startswith(b'data: '):
+                yield line[6:]  # Remover 'data: '
+    
     async def test_streaming_deanonymization(self, session_id: str):
         """
         Prueba la desanonimización en streaming
@@ -37,18 +87,32 @@ class ShieldAITestClient:
         url = f"{self.base_url}/deanonymize/stream"
         payload = {"session_id": session_id}
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as response:
-                print("=== RESPUESTA STREAMING ===")
-                async for line in response.content:
-                    if line:
-                        line_str = line.decode('utf-8').strip()
-                        if line_str.startswith('data: '):
-                            data = json.loads(line_str[6:])  # Remover 'data: '
-                            if 'chunk' in data:
-                                print(data['chunk'], end='', flush=True)
-                            elif 'status' in data:
-                                print(f"\n[{data['status']}]")
+        # Los chunks se acumulan y se escriben en bloque para no hacer un flush por chunk
+        out = []
+        out_len = 0
+        
+        def flush_out():
+            nonlocal out_len
+            if out:
+                sys.stdout.write(''.join(out))
+                sys.stdout.flush()
+                out.clear()
+                out_len = 0
+        
+        session = await self._get_session()
+        async with session.post(url, json=payload) as response:
+            print("=== RESPUESTA STREAMING ===")
+            async for raw in self._iter_sse_data(response):
+                data = _json_loads(raw)
+                if 'chunk' in data:
+                    out.append(data['chunk'])
+                    out_len += len(data['chunk'])
+                    if out_len >= STDOUT_FLUSH_BYTES:
+                        flush_out()
+                elif 'status' in data:
+                    out.append(f"\n[{data['status']}]\n")
+                    flush_out()
+            flush_out()
     
     async def test_dual_streaming(self, session_id: str):
         """
@@ -60,54 +124,51 @@ class ShieldAITestClient:
         anonymous_text = ""
         deanonymized_text = ""
         
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url, json=payload) as response:
-                print("=== STREAMING DUAL ===")
-                print("📊 Monitoreando streams...")
-                
-                async for line in response.content:
-                    if line:
-                        line_str = line.decode('utf-8').strip()
-                        if line_str.startswith('data: '):
-                            try:
-                                data = json.loads(line_str[6:])  # Remover 'data: '
-                                
-                                if data.get('type') == 'anonymous':
-                                    anonymous_text += data.get('chunk', '')
-                                elif data.get('type') == 'deanonymized':
-                                    deanonymized_text += data.get('chunk', '')
-                                elif data.get('type') == 'status' and data.get('status') == 'complete':
-                                    print("\n\n✅ Streaming completado!")
-                                    break
-                                    
-                            except json.JSONDecodeError as e:
-                                print(f"❌ Error parsing JSON: {e}")
-                
-                print("\n📝 RESULTADO FINAL:")
-                print("\n🎭 TEXTO ANONIMIZADO:")
-                print(anonymous_text)
-                print("\n🔓 TEXTO DESANONIMIZADO:")
-                print(deanonymized_text)
+        session = await self._get_session()
+        async with session.post(url, json=payload) as response:
+            print("=== STREAMING DUAL ===")
+            print("📊 Monitoreando streams...")
+            
+            async for raw in self._iter_sse_data(response):
+                try:
+                    data = _json_loads(raw)
+                    
+                    if data.get('type') == 'anonymous':
+                        anonymous_text += data.get('chunk', '')
+                    elif data.get('type') == 'deanonymized':
+                        deanonymized_text += data.get('chunk', '')
+                    elif data.get('type') == 'status' and data.get('status') == 'complete':
+                        print("\n\n✅ Streaming completado!")
+                        break
+                        
+                except json.JSONDecodeError as e:
+                    print(f"❌ Error parsing JSON: {e}")
+            
+            print("\n📝 RESULTADO FINAL:")
+            print("\n🎭 TEXTO ANONIMIZADO:")
+            print(anonymous_text)
+            print("\n🔓 TEXTO DESANONIMIZADO:")
+            print(deanonymized_text)
     
     def test_full_process(self, session_id: str) -> Dict:
         """
         Prueba el proceso completo de desanonimización
         """
-        response = requests.get(f"{self.base_url}/deanonymize/test/{session_id}")
+        response = self._http.get(f"{self.base_url}/deanonymize/test/{session_id}")
         return response.json()
     
     def get_session_status(self, session_id: str) -> Dict:
         """
         Obtiene el estado de una sesión
         """
-        response = requests.get(f"{self.base_url}/sessions/{session_id}/status")
+        response = self._http.get(f"{self.base_url}/sessions/{session_id}/status")
         return response.json()
     
     def list_active_sessions(self) -> Dict:
         """
         Lista todas las sesiones activas
         """
-        response = requests.get(f"{self.base_url}/sessions/")
+        response = self._http.get(f"{self.base_url}/sessions/")
         return response.json()
     
     def create_custom_session(self, session_id: str, anonymization_map: Dict[str, str], ttl: int = 3600) -> Dict:
@@ -119,14 +180,14 @@ class ShieldAITestClient:
             "anonymization_map": anonymization_map,
             "ttl": ttl
         }
-        response = requests.post(f"{self.base_url}/sessions/", json=payload)
+        response = self._http.post(f"{self.base_url}/sessions/", json=payload)
         return response.json()
     
     def delete_session(self, session_id: str) -> Dict:
         """
         Elimina una sesión
         """
-        response = requests.delete(f"{self.base_url}/sessions/{session_id}")
+        response = self._http.delete(f"{self.base_url}/sessions/{session_id}")
         return response.json()
 
 # === EJEMPLOS DE USO ===
@@ -182,6 +243,9 @@ async def main():
     
     print("\n🔓 RESPUESTA FINAL (desanonimizada):")
     print(full_test['step_3_deanonymized_response'])
+    
+    await client.aclose()
+    client.close()
 
 def test_synchronous_examples():
     """
@@ -236,6 +300,7 @@ def test_synchronous_examples():
     print(f"\n🧹 Limpiando sesiones...")
     client.delete_session(session_id)
     client.delete_session(custom_session)
+    client.close()
 
 if __name__ == "__main__":
     print("Selecciona el tipo de prueba:")
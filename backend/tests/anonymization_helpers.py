@@ -0,0 +1,31 @@
+"""
+Helpers shared by the PDF, Word and Excel anonymization tests.
+"""
+
+import logging
+
+log = logging.getLogger(__name__)
+
+
+def log_banner(title):
+    """Log a test banner; skipped entirely unless INFO is enabled."""
+    if log.isEnabledFor(logging.INFO):
+        log.info("%s\n%s\n%s", "=" * 60, title, "=" * 60)
+
+
+def check_entity(text_lower, entity_value):
+    """Check if entity (or any of a tuple of alternatives) is present in already lowercased text."""
+    values = (entity_value,) if isinstance(entity_value, str) else entity_value
+    return any(value.lower() in text_lower for value in values)
+
+
+def validate_email_domain(mapping, expected_domain):
+    """Validate that emails preserve domain."""
+    # Single pass: stop at the first email outside the domain
+    seen_email = False
+    for value in mapping.values():
+        if '@' in value:
+            if expected_domain not in value:
+                return False
+            seen_email = True
+    return seen_email
@@ -0,0 +1,212 @@
+"""
+Shared pytest fixtures for the backend test suite.
+"""
+
+import hashlib
+import logging
+import os
+import sys
+from importlib import metadata
+from pathlib import Path
+
+import pytest
+
+try:
+    import fitz  # PyMuPDF
+    FITZ_AVAILABLE = True
+except ImportError:
+    FITZ_AVAILABLE = False
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+TESTS_DIR = Path(__file__).parent
+APP_DIR = TESTS_DIR.parent / 'app'
+FIXTURES_DIR = TESTS_DIR / 'fixtures'
+
+# Make backend/app and the shared test helpers importable once for every test module
+for _path in (str(APP_DIR), str(TESTS_DIR)):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+# Installed distributions whose versions change the pipeline output
+PIPELINE_PACKAGES = (
+    'transformers',
+    'torch',
+    'phonenumbers',
+    'python-dateutil',
+    'Faker',
+    'pdfplumber',
+    'PyMuPDF',
+    'python-docx',
+    'openpyxl',
+)
+
+# Reusing pipeline results across runs is opt-in: SHIELD_REUSE_PIPELINE_CACHE=1
+REUSE_PIPELINE_CACHE = os.getenv('SHIELD_REUSE_PIPELINE_CACHE', '').lower() in ('1', 'true', 'yes')
+
+log = logging.getLogger(__name__)
+
+
+def _package_version(name):
+    """Installed version of a distribution, or 'missing'."""
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return 'missing'
+
+
+def _pipeline_version():
+    """Hash every app source and the pipeline package versions."""
+    digest = hashlib.blake2b(digest_size=16)
+    for name in PIPELINE_PACKAGES:
+        digest.update(f"{name}=={_package_version(name)};".encode())
+    for source in sorted(APP_DIR.rglob('*.py')):
+        digest.update(source.relative_to(APP_DIR).as_posix().encode())
+        digest.update(source.read_bytes())
+    return digest.hexdigest()
+
+
+PIPELINE_VERSION = _pipeline_version() if REUSE_PIPELINE_CACHE else None
+
+
+@pytest.fixture(scope="session")
+def hf_ner_es():
+    """Load the Spanish NER model once per session (per worker under xdist)."""
+    from services import pii_detector
+
+    if not pii_detector.HF_AVAILABLE:
+        return None
+    return pii_detector.get_hf_ner(pii_detector.HF_MODELS['es'])
+
+
+@pytest.fixture(scope="session")
+def redis_client():
+    """One Redis connection for the whole session, or None if it is unreachable.
+
+    Connects with the app's own settings (SHIELD_AI_REDIS_*), so it targets the
+    same database as the server under test.
+    """
+    try:
+        from core.config import get_redis_url
+    except ImportError as e:
+        log.warning(f"Configuración de la app no disponible para limpieza directa: {e}")
+        yield None
+        return
+    if not REDIS_AVAILABLE:
+        yield None
+        return
+
+    client = redis.Redis.from_url(get_redis_url())
+    try:
+        client.ping()
+    except redis.RedisError as e:
+        log.warning(f"Redis no disponible para limpieza directa: {e}")
+        client.close()
+        yield None
+        return
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def fast_pdf(monkeypatch):
+    """Extract PDF text with PyMuPDF instead of pdfplumber when it is installed."""
+    if not FITZ_AVAILABLE:
+        return
+    from services.document_processing.base import DocumentProcessingError
+    from services.document_processing.pdf_processor import PDFProcessor
+
+    def extract_text(self, file_content):
+        with fitz.open(stream=file_content, filetype="pdf") as doc:
+            text = "\n\n".join(page.get_text() for page in doc).strip()
+        if not text:
+            raise DocumentProcessingError("No text could be extracted from PDF")
+        return text
+
+    monkeypatch.setattr(PDFProcessor, 'extract_text', extract_text)
+
+
+@pytest.fixture(scope="session")
+def parse_cache():
+    """Process-local results of anonymize_fixture, keyed by (blake2b digest, content type, extractor)."""
+    return {}
+
+
+@pytest.fixture(scope="session")
+def anonymize_fixture(pytestconfig, parse_cache, hf_ner_es):
+    """Return a loader that extracts and anonymizes a file from tests/fixtures.
+
+    Results are memoized in parse_cache for the session. With
+    SHIELD_REUSE_PIPELINE_CACHE=1 they are also kept in pytest's cache across
+    runs, keyed by file content, content type, PDF extractor and
+    PIPELINE_VERSION; --cache-clear drops them.
+    """
+    from services.document_processing.factory import process_document
+    from services.document_processing.pdf_processor import PDFProcessor
+    from services.pii_detector import run_pipeline
+
+    def load(filename, content_type):
+        fixture_path = FIXTURES_DIR / filename
+
+        if not fixture_path.exists():
+            pytest.skip(f"Fixture not found: {filename}")
+
+        file_content = fixture_path.read_bytes()
+
+        # The extractor in use (fast_pdf patches it) is part of every key
+        extractor = PDFProcessor.extract_text
+        extractor_id = f"{extractor.__module__}.{extractor.__qualname__}"
+
+        memory_key = (hashlib.blake2b(file_content).digest(), content_type, extractor_id)
+        if memory_key in parse_cache:
+            return parse_cache[memory_key]
+
+        cache_key = None
+        if REUSE_PIPELINE_CACHE:
+            digest = hashlib.blake2b(b'|'.join((
+                file_content,
+                content_type.encode(),
+                extractor_id.encode(),
+                PIPELINE_VERSION.encode(),
+            ))).hexdigest()
+            cache_key = f"shield/fixtures/{digest}"
+            cached = pytestconfig.cache.get(cache_key, None)
+            if cached is not None:
+                result = parse_cache[memory_key] = tuple(cached)
+                log.info(f"\n♻️  Resultado en caché para {filename} ({len(result[2])} entidades)")
+                return result
+
+        document = process_document(
+            file_content=file_content,
+            filename=filename,
+            content_type=content_type
+        )
+
+        extracted_text = document['text']
+        log.info(f"\n📄 Texto extraído ({len(extracted_text)} chars):")
+        log.info(f"   {extracted_text[:200]}...")
+
+        anon_result = run_pipeline(
+            model='es',
+            text=extracted_text,
+            use_regex=True,
+            pseudonymize=False,
+            save_mapping=False,
+            use_realistic_fake=True
+        )
+
+        anonymized = anon_result.get('anonymized', extracted_text)
+        mapping = anon_result.get('mapping', {})
+
+        log.info(f"🗺️  Mapping: {len(mapping)} entidades detectadas")
+
+        result = parse_cache[memory_key] = (extracted_text, anonymized, mapping)
+        if cache_key is not None:
+            pytestconfig.cache.set(cache_key, list(result))
+        return result
+
+    return load
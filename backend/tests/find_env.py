@@ -1,6 +1,18 @@
 import os
+from functools import lru_cache
 from pathlib import Path
 
+# Archivos/carpetas que marcan la raíz del proyecto
+PROJECT_ROOT_MARKERS = ('.git', 'pyproject.toml')
+
+@lru_cache(maxsize=None)
+def _find_project_root():
+    """Devuelve la raíz del proyecto (primer padre con un marcador) o None"""
+    for parent in Path(__file__).resolve().parents:
+        if any((parent / marker).exists() for marker in PROJECT_ROOT_MARKERS):
+            return parent
+    return None
+
 def find_env_files():
     """Busca todos los archivos .env en el proyecto"""
     
@@ -11,15 +23,16 @@ def find_env_files():
     current_dir = Path(__file__).parent.absolute()
     print(f"📁 Directorio actual del script: {current_dir}")
     
-    # Buscar hacia arriba hasta encontrar la raíz del proyecto
+    # Buscar hacia arriba hasta la raíz del proyecto (cacheada)
+    project_root = _find_project_root()
     search_paths = []
     current = current_dir
     
-    # Buscar hasta 5 niveles hacia arriba
+    # Sin raíz detectada, buscar hasta 5 niveles hacia arriba
     for i in range(6):
         search_paths.append(current)
         parent = current.parent
-        if parent == current:  # Llegamos a la raíz del sistema
+        if current == project_root or parent == current:  # Raíz del proyecto o del sistema
             break
         current = parent
     
@@ -37,8 +50,7 @@ def find_env_files():
             
             # Mostrar contenido (censurado)
             try:
-                with open(env_path, 'r') as f:
-                    lines = f.readlines()
+                lines = env_path.read_text(encoding='utf-8', errors='replace').splitlines()
                 
                 print(f"    📄 Contenido ({len(lines)} líneas):")
                 for line_num, line in enumerate(lines, 1):
@@ -100,15 +112,21 @@ def show_directory_structure():
         # Mostrar archivos importantes en el directorio actual del script
         if path == current:
             try:
-                files = list(path.glob("*"))
-                py_files = [f for f in files if f.suffix == '.py']
-                env_files = [f for f in files if f.name == '.env']
+                # Una sola pasada con os.scandir, sin crear objetos Path por entrada
+                py_files = []
+                env_files = []
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.name == '.env':
+                            env_files.append(entry.name)
+                        elif entry.name.endswith('.py'):
+                            py_files.append(entry.name)
                 
-                for f in py_files[:3]:  # Mostrar hasta 3 archivos .py
-                    print(f"{indent}  └── {f.name}")
+                for name in py_files[:3]:  # Mostrar hasta 3 archivos .py
+                    print(f"{indent}  └── {name}")
                 
-                for f in env_files:
-                    print(f"{indent}  └── {f.name} ✅")
+                for name in env_files:
+                    print(f"{indent}  └── {name} ✅")
                     
             except:
                 pass
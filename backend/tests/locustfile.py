@@ -1,11 +1,12 @@
 from locust import HttpUser, task, between, events
+from pathlib import Path
+import os
 import time
 
-# Variables globales para métricas personalizadas
-max_response_time = 0
-min_response_time = float("inf")
-total_requests = 0
-total_failures = 0
+# Ruta del informe final (configurable con SHIELD_STRESS_REPORT)
+REPORT_PATH = Path(os.environ.get("SHIELD_STRESS_REPORT", "stress_report.txt"))
+
+# Inicio del test; el resto de métricas sale de environment.stats (estadísticas de Locust)
 start_time = None
 
 @events.test_start.add_listener
@@ -13,20 +14,14 @@ def on_test_start(environment, **kwargs):
     global start_time
     start_time = time.time()
 
-@events.request.add_listener
-def on_request(request_type, name, response_time, response_length, response, context, exception, start_time, url, **kwargs):
-    global max_response_time, min_response_time, total_requests, total_failures
-    total_requests += 1
-    if exception or (response is not None and not response.ok):
-        total_failures += 1
-    if response_time > max_response_time:
-        max_response_time = response_time
-    if response_time < min_response_time:
-        min_response_time = response_time
-
 @events.test_stop.add_listener
 def on_test_stop(environment, **kwargs):
     duration = time.time() - start_time if start_time else 0
+    total = environment.stats.total
+    total_requests = total.num_requests
+    total_failures = total.num_failures
+    max_response_time = total.max_response_time
+    min_response_time = total.min_response_time if total.min_response_time is not None else float("inf")
     report = (
         f"--- Stress Test Report ---\n"
         f"Total Requests: {total_requests}\n"
@@ -36,13 +31,12 @@ def on_test_stop(environment, **kwargs):
         f"Test Duration (s): {duration:.2f}\n"
         f"Requests per Second: {total_requests/duration if duration > 0 else 0:.2f}\n"
         f"Failure Rate: {100*total_failures/total_requests if total_requests > 0 else 0:.2f}%\n"
-        f"Estimated Max Concurrent Users Supported: {estimate_max_users()}\n"
+        f"Estimated Max Concurrent Users Supported: {estimate_max_users(total_requests, total_failures, max_response_time)}\n"
     )
-    with open(r"C:\Users\admin\Desktop\SHIELD-AI\proyecto_final\shield_ai\docs\stress_report.txt", "w", encoding="utf-8") as f:
-        f.write(report)
+    REPORT_PATH.write_text(report, encoding="utf-8")
     print(report)
 
-def estimate_max_users():
+def estimate_max_users(total_requests, total_failures, max_response_time):
     # Heurística simple: si el 95% de las respuestas son < 1s y el error < 2%, se considera soportado
     if total_requests == 0:
         return 0
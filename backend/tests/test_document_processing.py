@@ -6,17 +6,38 @@ Run with: pytest backend/tests/test_document_processing.py -v
 
 import os
 import io
+import itertools
+import logging
 import pytest
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+try:
+    from requests_toolbelt import MultipartEncoder
+    TOOLBELT_AVAILABLE = True
+except ImportError:
+    TOOLBELT_AVAILABLE = False
 
 
 BASE_URL = "http://localhost:8000"
 TEST_SESSION_PREFIX = "test_doc"
 
+# Key types removed by SessionManager.delete_session
+SESSION_KEY_TYPES = ("map", "meta", "llm", "request")
+
+log = logging.getLogger(__name__)
+
+# Unique per run; tests only add a counter instead of reading os.urandom each time
+_RUN_ID = os.urandom(4).hex()
+_session_counter = itertools.count()
 
+
+@lru_cache(maxsize=None)
 def generate_test_pdf():
-    """Generate a simple test PDF in memory."""
+    """Generate a simple test PDF in memory (built once, then cached)."""
     try:
         from reportlab.pdfgen import canvas
         from reportlab.lib.pagesizes import letter
@@ -28,14 +49,14 @@ def generate_test_pdf():
         c.drawString(100, 710, "Email: juan.perez@email.com")
         c.drawString(100, 690, "Phone: +34 612 345 678")
         c.save()
-        buffer.seek(0)
         return buffer.getvalue()
     except ImportError:
         pytest.skip("reportlab not installed")
 
 
+@lru_cache(maxsize=None)
 def generate_test_docx():
-    """Generate a simple test Word document in memory."""
+    """Generate a simple test Word document in memory (built once, then cached)."""
     try:
         from docx import Document
         
@@ -45,14 +66,14 @@ def generate_test_docx():
         doc.add_paragraph("Name: María López")
         doc.add_paragraph("Email: maria.lopez@email.com")
         doc.save(buffer)
-        buffer.seek(0)
         return buffer.getvalue()
     except ImportError:
         pytest.skip("python-docx not installed")
 
 
+@lru_cache(maxsize=None)
 def generate_test_xlsx():
-    """Generate a simple test Excel document in memory."""
+    """Generate a simple test Excel document in memory (built once, then cached)."""
     try:
         from openpyxl import Workbook
         
@@ -64,38 +85,89 @@ def generate_test_xlsx():
         ws['A2'] = 'Carlos García'
         ws['B2'] = 'carlos.garcia@email.com'
         wb.save(buffer)
-        buffer.seek(0)
         return buffer.getvalue()
     except ImportError:
         pytest.skip("openpyxl not installed")
 
 
-class TestDocumentProcessing:
-    """Test suite for document processing endpoints."""
+def post_document(http, files, data=None):
+    """POST to /document/process, streaming the multipart body when requests-toolbelt is installed."""
+    url = f"{BASE_URL}/document/process"
+    if not TOOLBELT_AVAILABLE:
+        return http.post(url, files=files, data=data)
     
-    @pytest.fixture(autouse=True)
-    def setup(self):
-        """Setup for each test."""
-        self.session_id = f"{TEST_SESSION_PREFIX}_{os.urandom(4).hex()}"
-        yield
-        try:
-            requests.delete(f"{BASE_URL}/sessions/{self.session_id}")
-        except:
-            pass
+    fields = dict(data or {})
+    for name, (filename, content, content_type) in files.items():
+        fields[name] = (filename, io.BytesIO(content), content_type)
+    encoder = MultipartEncoder(fields=fields)
+    return http.post(url, data=encoder, headers={'Content-Type': encoder.content_type})
+
+
+def post_document_own_session(files, data=None):
+    """post_document on a private requests.Session, for use from worker threads."""
+    with requests.Session() as http:
+        return post_document(http, files, data)
+
+
+def delete_sessions(http, redis_client, *session_ids):
+    """Delete test sessions with one Redis DEL, or through the API if Redis is unreachable."""
+    if redis_client is not None:
+        # Keys come from the app's own storage layout, so they match what the server wrote
+        from services.session.storage import get_storage
+
+        storage = get_storage()
+        redis_client.delete(*(
+            storage._build_key(key_type, session_id)
+            for session_id in session_ids
+            for key_type in SESSION_KEY_TYPES
+        ))
+        return
+    for session_id in session_ids:
+        http.delete(f"{BASE_URL}/sessions/{session_id}")
+
+
+@pytest.fixture(scope="module")
+def http():
+    """Keep-alive HTTP session shared by every test in the module."""
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    session.headers["Connection"] = "keep-alive"
+    yield session
+    session.close()
+
+
+class TestHealthEndpoints:
+    """Read-only endpoint checks; no session to create or clean up."""
     
-    def test_health_check(self):
+    def test_health_check(self, http):
         """Test that the API is running."""
-        response = requests.get(f"{BASE_URL}/health")
+        response = http.get(f"{BASE_URL}/health")
         assert response.status_code == 200
         assert response.json()["success"] == True
     
-    def test_redis_connection(self):
+    def test_redis_connection(self, http):
         """Test that Redis is connected."""
-        response = requests.get(f"{BASE_URL}/health/redis")
+        response = http.get(f"{BASE_URL}/health/redis")
         assert response.status_code == 200
         data = response.json()
         assert data["connected"] == True
         assert data["redis_status"] == "healthy"
+
+
+class TestDocumentProcessing:
+    """Test suite for document processing endpoints."""
+    
+    @pytest.fixture(autouse=True)
+    def setup(self, http, redis_client):
+        """Setup for each test."""
+        self.http = http
+        self.redis_client = redis_client
+        self.session_id = f"{TEST_SESSION_PREFIX}_{_RUN_ID}_{next(_session_counter)}"
+        yield
+        try:
+            delete_sessions(self.http, self.redis_client, self.session_id)
+        except Exception as e:
+            log.warning(f"Could not clean up session {self.session_id}: {e}")
     
     def test_process_pdf(self):
         """Test PDF document processing."""
@@ -104,11 +176,7 @@ class TestDocumentProcessing:
         files = {'file': ('test.pdf', pdf_content, 'application/pdf')}
         data = {'session_id': self.session_id}
         
-        response = requests.post(
-            f"{BASE_URL}/document/process",
-            files=files,
-            data=data
-        )
+        response = post_document(self.http, files, data)
         
         assert response.status_code == 200
         result = response.json()
@@ -127,11 +195,7 @@ class TestDocumentProcessing:
         files = {'file': ('test.docx', docx_content, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')}
         data = {'session_id': self.session_id}
         
-        response = requests.post(
-            f"{BASE_URL}/document/process",
-            files=files,
-            data=data
-        )
+        response = post_document(self.http, files, data)
         
         assert response.status_code == 200
         result = response.json()
@@ -146,11 +210,7 @@ class TestDocumentProcessing:
         files = {'file': ('test.xlsx', xlsx_content, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')}
         data = {'session_id': self.session_id}
         
-        response = requests.post(
-            f"{BASE_URL}/document/process",
-            files=files,
-            data=data
-        )
+        response = post_document(self.http, files, data)
         
         assert response.status_code == 200
         result = response.json()
@@ -158,16 +218,47 @@ class TestDocumentProcessing:
         assert result["document_info"]["detected_type"] == "excel"
         assert "mapping" in result
     
+    def test_process_all_formats_parallel(self):
+        """Test concurrent processing of PDF, Word and Excel uploads."""
+        uploads = [
+            ('pdf', ('test.pdf', generate_test_pdf(), 'application/pdf')),
+            ('word', ('test.docx', generate_test_docx(), 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')),
+            ('excel', ('test.xlsx', generate_test_xlsx(), 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')),
+        ]
+        # One session per upload so concurrent requests never share Redis keys
+        session_ids = [f"{self.session_id}_{i}" for i in range(len(uploads))]
+        
+        try:
+            with ThreadPoolExecutor(max_workers=len(uploads)) as executor:
+                futures = [
+                    executor.submit(
+                        post_document_own_session,
+                        {'file': file_tuple},
+                        {'session_id': session_id}
+                    )
+                    for (_, file_tuple), session_id in zip(uploads, session_ids)
+                ]
+                responses = [future.result() for future in futures]
+            
+            for (expected_type, _), response in zip(uploads, responses):
+                assert response.status_code == 200
+                result = response.json()
+                assert result["success"] == True
+                assert result["document_info"]["detected_type"] == expected_type
+                assert "mapping" in result
+        finally:
+            try:
+                delete_sessions(self.http, self.redis_client, *session_ids)
+            except Exception as e:
+                log.warning(f"Could not clean up sessions {session_ids}: {e}")
+    
     def test_auto_generate_session_id(self):
         """Test automatic session ID generation."""
         pdf_content = generate_test_pdf()
         
         files = {'file': ('test.pdf', pdf_content, 'application/pdf')}
         
-        response = requests.post(
-            f"{BASE_URL}/document/process",
-            files=files
-        )
+        response = post_document(self.http, files)
         
         assert response.status_code == 200
         result = response.json()
@@ -181,14 +272,10 @@ class TestDocumentProcessing:
         files = {'file': ('test.pdf', pdf_content, 'application/pdf')}
         data = {'session_id': self.session_id}
         
-        process_response = requests.post(
-            f"{BASE_URL}/document/process",
-            files=files,
-            data=data
-        )
+        process_response = post_document(self.http, files, data)
         assert process_response.status_code == 200
         
-        mapping_response = requests.get(
+        mapping_response = self.http.get(
             f"{BASE_URL}/document/mapping/{self.session_id}"
         )
         
@@ -205,11 +292,7 @@ class TestDocumentProcessing:
         files = {'file': ('test.pdf', pdf_content, 'application/pdf')}
         data = {'session_id': self.session_id}
         
-        process_response = requests.post(
-            f"{BASE_URL}/document/process",
-            files=files,
-            data=data
-        )
+        process_response = post_document(self.http, files, data)
         assert process_response.status_code == 200
         anonymized_text = process_response.json()["anonymized_text"]
         
@@ -218,7 +301,7 @@ class TestDocumentProcessing:
             'anonymized_text': anonymized_text
         }
         
-        deanon_response = requests.post(
+        deanon_response = self.http.post(
             f"{BASE_URL}/document/deanonymize",
             data=deanon_data
         )
@@ -236,9 +319,9 @@ class TestDocumentProcessing:
         files = {'file': ('test.pdf', pdf_content, 'application/pdf')}
         data = {'session_id': self.session_id}
         
-        requests.post(f"{BASE_URL}/document/process", files=files, data=data)
+        post_document(self.http, files, data)
         
-        status_response = requests.get(
+        status_response = self.http.get(
             f"{BASE_URL}/sessions/{self.session_id}/status"
         )
         
@@ -253,11 +336,7 @@ class TestDocumentProcessing:
         files = {'file': ('test.txt', b'Plain text content', 'text/plain')}
         data = {'session_id': self.session_id}
         
-        response = requests.post(
-            f"{BASE_URL}/document/process",
-            files=files,
-            data=data
-        )
+        response = post_document(self.http, files, data)
         
         assert response.status_code == 400
     
@@ -266,11 +345,7 @@ class TestDocumentProcessing:
         files = {'file': ('test.pdf', b'', 'application/pdf')}
         data = {'session_id': self.session_id}
         
-        response = requests.post(
-            f"{BASE_URL}/document/process",
-            files=files,
-            data=data
-        )
+        response = post_document(self.http, files, data)
         
         assert response.status_code == 400
 
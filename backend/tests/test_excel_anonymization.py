@@ -3,131 +3,109 @@ Excel document anonymization tests.
 
 Tests extraction, PII detection, and Faker generation for Excel documents in Spanish.
 Validates detection rate, data quality, and structure preservation.
+
+The fixture tests are independent (no API or Redis), so the PDF and Excel
+modules can run on separate workers:
+    pytest -n auto --dist loadfile backend/tests/test_pdf_anonymization.py backend/tests/test_excel_anonymization.py
 """
 
-import sys
-from pathlib import Path
+import logging
 
 import pytest
 
-sys.path.insert(0, str(Path(__file__).parent.parent / 'app'))
-
-from services.document_processing.factory import process_document
-from services.pii_detector import run_pipeline
-
-
-def load_and_anonymize(filename):
-    """Load Excel fixture and anonymize it."""
-    fixture_path = Path(__file__).parent / 'fixtures' / filename
-    
-    if not fixture_path.exists():
-        pytest.skip(f"Fixture not found: {filename}")
-    
-    with open(fixture_path, 'rb') as f:
-        file_content = f.read()
-    
-    result = process_document(
-        file_content=file_content,
-        filename=filename,
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    )
-    
-    extracted_text = result['text']
-    print(f"\n📄 Texto extraído ({len(extracted_text)} chars):")
-    print(f"   {extracted_text[:200]}...")
-    
-    anon_result = run_pipeline(
-        model='es',
-        text=extracted_text,
-        use_regex=True,
-        pseudonymize=False,
-        save_mapping=False,
-        use_realistic_fake=True
-    )
-    
-    anonymized = anon_result.get('anonymized', extracted_text)
-    mapping = anon_result.get('mapping', {})
-    
-    print(f"🗺️  Mapping: {len(mapping)} entidades detectadas")
-    
-    return extracted_text, anonymized, mapping
-
-
-def check_entity(text, entity_value):
-    """Check if entity is present in text."""
-    return entity_value.lower() in text.lower()
-
-
-def validate_email_domain(mapping, expected_domain):
-    """Validate that emails preserve domain."""
-    emails = [v for v in mapping.values() if '@' in v]
-    if not emails:
-        return False
-    return all(expected_domain in e for e in emails)
-
-
-def test_excel_simple_form():
+from anonymization_helpers import check_entity, log_banner, validate_email_domain
+
+CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Diagnostics go through logging; show them with -o log_cli=true --log-cli-level=INFO
+log = logging.getLogger(__name__)
+
+
+# Expected values per fixture (built once at import)
+SIMPLE_FORM_CHECKS = (
+    ('Nombre', 'Luis Fernández Morales'),
+    ('Email', 'luis.fernandez@innovatech.es'),
+    ('Teléfono', '612 789 456'),
+    ('DNI', '45678901Z'),
+    ('Dirección', ('Avenida de América', 'Barcelona')),
+)
+
+TABLE_EMPLOYEES = (
+    'Teresa López Navarro',
+    'Miguel Sánchez Ortiz',
+    'Patricia Ramírez Gil',
+)
+
+NARRATIVE_CHECKS = (
+    ('Persona 1', 'Carmen Vega Soler'),
+    ('Email 1', 'carmen.vega@medicalcorp.es'),
+    ('Teléfono 1', '655 432 109'),
+    ('NIF', '23456789K'),
+    ('IBAN', ('ES12', '0049 0182')),
+    ('Persona 2', 'Alberto Ruiz Campos'),
+    ('Email 2', 'alberto.ruiz@medicalcorp.es'),
+    ('Organización', 'MediCare Solutions'),
+)
+
+MIXED_CHECKS = (
+    ('Persona principal', 'Sergio Moreno Castillo'),
+    ('Contacto emergencia 1', 'Mónica Moreno López'),
+    ('Contacto emergencia 2', 'David Castillo Pérez'),
+    ('IBAN', ('ES45', '2100 0813')),
+    ('Dirección', 'Alcalá'),
+)
+
+
+def test_excel_simple_form(anonymize_fixture):
     """Test formulario básico Excel con 5 entidades PII esperadas."""
-    print("\n" + "=" * 60)
-    print("TEST: Formulario Simple Excel Español")
-    print("=" * 60)
+    log_banner("TEST: Formulario Simple Excel Español")
     
-    extracted, anonymized, mapping = load_and_anonymize('excel_simple_form.xlsx')
+    extracted, anonymized, mapping = anonymize_fixture('excel_simple_form.xlsx', CONTENT_TYPE)
+    text_lower = extracted.lower()
     
     assert len(extracted) > 0, "No se extrajo texto"
     
-    print("\n🔍 Validando detección:")
-    checks = [
-        ('Nombre', 'Luis Fernández Morales'),
-        ('Email', 'luis.fernandez@innovatech.es'),
-        ('Teléfono', '612 789 456'),
-        ('DNI', '45678901Z'),
-        ('Dirección', 'Avenida de América' or 'Barcelona')
-    ]
+    log.info("\n🔍 Validando detección:")
+    checks = SIMPLE_FORM_CHECKS
     
     detected_count = 0
     for entity_type, value in checks:
-        found = check_entity(extracted, value)
+        found = check_entity(text_lower, value)
         status = "✓" if found else "✗"
-        print(f"  {status} {entity_type}: {value}")
+        log.info(f"  {status} {entity_type}: {value}")
         if found:
             detected_count += 1
     
     detection_rate = (detected_count / len(checks)) * 100
-    print(f"\n📊 Tasa de detección: {detected_count}/{len(checks)} ({detection_rate:.0f}%)")
+    log.info(f"\n📊 Tasa de detección: {detected_count}/{len(checks)} ({detection_rate:.0f}%)")
     
     assert len(mapping) >= 3, f"Se esperaban al menos 3 entidades, se obtuvieron {len(mapping)}"
     
     if validate_email_domain(mapping, 'innovatech.es'):
-        print("✓ Dominio de email preservado")
+        log.info("✓ Dominio de email preservado")
     
-    print("\n✅ Test PASSED\n")
+    log.info("\n✅ Test PASSED\n")
 
 
-def test_excel_table():
+def test_excel_table(anonymize_fixture):
     """Test tabla estructurada Excel con 3 empleados (12 entidades PII esperadas)."""
-    print("\n" + "=" * 60)
-    print("TEST: Tabla de Empleados Excel Español")
-    print("=" * 60)
+    log_banner("TEST: Tabla de Empleados Excel Español")
     
-    extracted, anonymized, mapping = load_and_anonymize('excel_table.xlsx')
+    extracted, anonymized, mapping = anonymize_fixture('excel_table.xlsx', CONTENT_TYPE)
+    text_lower = extracted.lower()
     
-    print("\n🔍 Validando empleados:")
-    employees = [
-        'Teresa López Navarro',
-        'Miguel Sánchez Ortiz',
-        'Patricia Ramírez Gil'
-    ]
+    log.info("\n🔍 Validando empleados:")
+    employees = TABLE_EMPLOYEES
     
     detected_employees = 0
     for emp in employees:
-        found = check_entity(extracted, emp)
+        found = check_entity(text_lower, emp)
         status = "✓" if found else "✗"
-        print(f"  {status} {emp}")
+        log.info(f"  {status} {emp}")
         if found:
             detected_employees += 1
     
-    print(f"\n📊 Empleados detectados: {detected_employees}/{len(employees)}")
+    log.info(f"\n📊 Empleados detectados: {detected_employees}/{len(employees)}")
     
     assert len(mapping) >= 6, f"Se esperaban al menos 6 entidades, se obtuvieron {len(mapping)}"
     
@@ -135,80 +113,63 @@ def test_excel_table():
     if emails:
         domains = [e.split('@')[1] for e in emails]
         if len(set(domains)) == 1:
-            print(f"✓ Consistencia de dominio: {domains[0]}")
+            log.info(f"✓ Consistencia de dominio: {domains[0]}")
     
-    print("\n✅ Test PASSED\n")
+    log.info("\n✅ Test PASSED\n")
 
 
-def test_excel_narrative():
+def test_excel_narrative(anonymize_fixture):
     """Test hoja con texto narrativo Excel con 8 entidades PII esperadas."""
-    print("\n" + "=" * 60)
-    print("TEST: Texto Narrativo Excel Español")
-    print("=" * 60)
-    
-    extracted, anonymized, mapping = load_and_anonymize('excel_narrative.xlsx')
-    
-    print("\n🔍 Validando entidades:")
-    checks = [
-        ('Persona 1', 'Carmen Vega Soler'),
-        ('Email 1', 'carmen.vega@medicalcorp.es'),
-        ('Teléfono 1', '655 432 109'),
-        ('NIF', '23456789K'),
-        ('IBAN', 'ES12' or '0049 0182'),
-        ('Persona 2', 'Alberto Ruiz Campos'),
-        ('Email 2', 'alberto.ruiz@medicalcorp.es'),
-        ('Organización', 'MediCare Solutions')
-    ]
+    log_banner("TEST: Texto Narrativo Excel Español")
+    
+    extracted, anonymized, mapping = anonymize_fixture('excel_narrative.xlsx', CONTENT_TYPE)
+    text_lower = extracted.lower()
+    
+    log.info("\n🔍 Validando entidades:")
+    checks = NARRATIVE_CHECKS
     
     detected_count = 0
     for entity_type, value in checks:
-        found = check_entity(extracted, value)
+        found = check_entity(text_lower, value)
         status = "✓" if found else "✗"
-        print(f"  {status} {entity_type}")
+        log.info(f"  {status} {entity_type}")
         if found:
             detected_count += 1
     
-    print(f"\n📊 Tasa de detección: {detected_count}/{len(checks)} ({(detected_count/len(checks)*100):.0f}%)")
+    log.info(f"\n📊 Tasa de detección: {detected_count}/{len(checks)} ({(detected_count/len(checks)*100):.0f}%)")
     
     assert len(mapping) >= 4, f"Se esperaban al menos 4 entidades, se obtuvieron {len(mapping)}"
     
     if validate_email_domain(mapping, 'medicalcorp.es'):
-        print("✓ Dominio corporativo preservado")
+        log.info("✓ Dominio corporativo preservado")
     
-    print("\n✅ Test PASSED\n")
+    log.info("\n✅ Test PASSED\n")
 
 
-def test_excel_mixed():
+def test_excel_mixed(anonymize_fixture):
     """Test documento complejo Excel con múltiples hojas (12 PII esperadas)."""
-    print("\n" + "=" * 60)
-    print("TEST: Documento Mixto Excel Español")
-    print("=" * 60)
+    log_banner("TEST: Documento Mixto Excel Español")
     
-    extracted, anonymized, mapping = load_and_anonymize('excel_mixed.xlsx')
+    extracted, anonymized, mapping = anonymize_fixture('excel_mixed.xlsx', CONTENT_TYPE)
+    text_lower = extracted.lower()
     
-    print("\n🔍 Validando estructura:")
-    structure_checks = [
-        ('Persona principal', 'Sergio Moreno Castillo'),
-        ('Contacto emergencia 1', 'Mónica Moreno López'),
-        ('Contacto emergencia 2', 'David Castillo Pérez'),
-        ('IBAN', 'ES45' or '2100 0813'),
-        ('Dirección', 'Alcalá')
-    ]
+    log.info("\n🔍 Validando estructura:")
+    structure_checks = MIXED_CHECKS
     
     detected_count = 0
     for check_type, value in structure_checks:
-        found = check_entity(extracted, value)
+        found = check_entity(text_lower, value)
         status = "✓" if found else "✗"
-        print(f"  {status} {check_type}")
+        log.info(f"  {status} {check_type}")
         if found:
             detected_count += 1
     
-    print(f"\n📊 Tasa de detección: {detected_count}/{len(structure_checks)} ({(detected_count/len(structure_checks)*100):.0f}%)")
+    log.info(f"\n📊 Tasa de detección: {detected_count}/{len(structure_checks)} ({(detected_count/len(structure_checks)*100):.0f}%)")
     
     assert len(mapping) >= 6, f"Se esperaban al menos 6 entidades, se obtuvieron {len(mapping)}"
     
-    print("\n✅ Test PASSED\n")
+    log.info("\n✅ Test PASSED\n")
 
 
 if __name__ == "__main__":
-    pytest.main([__file__, '-v', '-s'])
\ No newline at end of file
+    pytest.main([__file__, '-v', '-o', 'log_cli=true', '--log-cli-level=INFO'])
\ No newline at end of file
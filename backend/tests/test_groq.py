@@ -1,5 +1,6 @@
 import os
-import requests
+import asyncio
+import httpx
 import json
 from dotenv import load_dotenv
 
@@ -9,6 +10,37 @@ ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(HERE)))
 env_path = os.path.join(ROOT_DIR, ".env")
 load_dotenv(dotenv_path=env_path)
 
+async def _probe_model(client, headers, model):
+    """Envía una petición mínima a un modelo y devuelve (modelo, respuesta | excepción)"""
+    payload = {
+        "model": model,
+        "messages": [
+            {
+                "role": "user",
+                "content": "Hola, responde solo con 'Test exitoso'"
+            }
+        ],
+        "max_tokens": 10,
+        "temperature": 0.1
+    }
+    
+    try:
+        response = await client.post(
+            "https://api.groq.com/openai/v1/chat/completions",
+            headers=headers,
+            json=payload
+        )
+        return model, response
+    except Exception as e:
+        return model, e
+
+
+async def _probe_models(headers, models):
+    """Prueba todos los modelos en paralelo sobre un único cliente HTTP"""
+    async with httpx.AsyncClient(timeout=30) as client:
+        return await asyncio.gather(*(_probe_model(client, headers, m) for m in models))
+
+
 def test_groq_api_direct():
     """Test directo de la API de Groq para diagnosticar el problema"""
     
@@ -33,7 +65,7 @@ def test_groq_api_direct():
             "Content-Type": "application/json"
         }
         
-        models_response = requests.get(
+        models_response = httpx.get(
             "https://api.groq.com/openai/v1/models", 
             headers=headers,
             timeout=10
@@ -56,46 +88,30 @@ def test_groq_api_direct():
     # Test 2: Hacer una petición simple con diferentes modelos
     test_models = ["llama3-8b-8192", "mixtral-8x7b-32768", "gemma-7b-it"]
     
-    for model in test_models:
+    # Las peticiones se lanzan a la vez; los resultados se muestran en el orden original
+    results = asyncio.run(_probe_models(headers, test_models))
+    
+    for model, response in results:
         print(f"\n🧪 Test 2: Probando modelo {model}")
         
-        payload = {
-            "model": model,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": "Hola, responde solo con 'Test exitoso'"
-                }
-            ],
-            "max_tokens": 10,
-            "temperature": 0.1
-        }
+        if isinstance(response, Exception):
+            print(f"❌ Excepción: {response}")
+            continue
         
-        try:
-            response = requests.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=30
-            )
-            
-            print(f"Status: {response.status_code}")
-            
-            if response.status_code == 200:
-                result = response.json()
-                message = result.get('choices', [{}])[0].get('message', {}).get('content', '')
-                print(f"✅ Respuesta exitosa: {message}")
-                return True
-            else:
-                print(f"❌ Error {response.status_code}:")
-                try:
-                    error_detail = response.json()
-                    print(f"   Detalle: {json.dumps(error_detail, indent=2)}")
-                except:
-                    print(f"   Texto: {response.text}")
-                    
-        except Exception as e:
-            print(f"❌ Excepción: {e}")
+        print(f"Status: {response.status_code}")
+        
+        if response.status_code == 200:
+            result = response.json()
+            message = result.get('choices', [{}])[0].get('message', {}).get('content', '')
+            print(f"✅ Respuesta exitosa: {message}")
+            return True
+        else:
+            print(f"❌ Error {response.status_code}:")
+            try:
+                error_detail = response.json()
+                print(f"   Detalle: {json.dumps(error_detail, indent=2)}")
+            except:
+                print(f"   Texto: {response.text}")
     
     print("\n❌ Todos los tests fallaron")
     return False